@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Throughput benchmarks of pigra hot paths on synthetic IGRA v2 data
+# python benchmarks/bench.py run --soundings 10000 --output results.json
+# python benchmarks/bench.py compare baseline.json results.json --threshold 0.1
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pigra.parser import IgraParser  # noqa: E402
+
+from generate import generate, compress  # noqa: E402
+
+
+def measure(function: Callable[[], None], repeat: int) -> float:
+    # best wall-clock time of several runs
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def result(seconds: float, lines: int, soundings: int) -> Dict[str, float]:
+    return {"seconds": seconds,
+            "lines_per_sec": lines / seconds,
+            "soundings_per_sec": soundings / seconds}
+
+
+def run(filename: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    with open(filename, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    headers = [x for x in lines if x[:1] == "#"]
+    levels = [x for x in lines if x[:1] != "#"]
+    nlines, nsoundings = len(lines), len(headers)
+
+    def parse_headers():
+        for line in headers:
+            IgraParser.parse_header(line)
+
+    def parse_levels():
+        for line in levels:
+            try:
+                IgraParser.parse_level(line)
+            except Exception:
+                pass
+
+    def parse(source: str):
+        for _ in IgraParser.from_file(source).parse():
+            pass
+
+    soundings = list(IgraParser.from_file(filename).parse())
+
+    def to_json():
+        for sounding in soundings:
+            sounding.to_json()
+
+    def cli():
+        with open(filename, "rb") as stdin:
+            subprocess.run([sys.executable, "-m", "pigra"], stdin=stdin, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    results = {
+        "parse_header": result(measure(parse_headers, repeat), len(headers), nsoundings),
+        "parse_level": result(measure(parse_levels, repeat), len(levels), nsoundings),
+    }
+    for name, source in (("parse_plain", filename), ("parse_gzip", filename + ".gz"), ("parse_zip", filename + ".zip")):
+        results[name] = result(measure(lambda: parse(source), repeat), nlines, nsoundings)
+    results["to_json"] = result(measure(to_json, repeat), nlines, nsoundings)
+    results["cli"] = result(measure(cli, repeat), nlines, nsoundings)
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """ Prints throughput ratios, returns False if a benchmark slowed down beyond threshold """
+    ok = True
+    for name, base in baseline["results"].items():
+        if name not in current["results"]:
+            continue
+        ratio = current["results"][name]["lines_per_sec"] / base["lines_per_sec"]
+        slower = ratio < 1 - threshold
+        ok &= not slower
+        print(f"{name:<14} {base['lines_per_sec']:>14,.0f} {current['results'][name]['lines_per_sec']:>14,.0f} lines/s"
+              f"  x{ratio:.2f}{'  SLOWER' if slower else ''}")
+    return ok
+
+
+def main():
+    args = argparse.ArgumentParser(description="pigra throughput benchmarks")
+    commands = args.add_subparsers(dest="command", required=True)
+    bench = commands.add_parser("run", help="runs the benchmarks")
+    bench.add_argument("--soundings", type=int, default=10000)
+    bench.add_argument("--hires", type=float, default=0.05, help="share of high-resolution soundings")
+    bench.add_argument("--repeat", type=int, default=3)
+    bench.add_argument("--output", help="results json file")
+    diff = commands.add_parser("compare", help="compares two result files")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    diff.add_argument("--threshold", type=float, default=0.1, help="tolerated slowdown ratio")
+    args = args.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        sys.exit(0 if compare(baseline, current, args.threshold) else 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "synthetic-data.txt")
+        nlines = generate(filename, args.soundings, hires=args.hires)
+        compress(filename)
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "soundings": args.soundings,
+            "lines": nlines,
+            "bytes": os.path.getsize(filename),
+            "results": run(filename, args.repeat)
+        }
+    for name, values in report["results"].items():
+        print(f"{name:<14} {values['lines_per_sec']:>14,.0f} lines/s {values['soundings_per_sec']:>12,.0f} soundings/s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
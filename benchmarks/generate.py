@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Synthetic IGRA v2 data files for benchmarks
+# python benchmarks/generate.py synthetic-data.txt --soundings 20000
+
+import argparse
+import gzip
+import os
+import random
+
+from zipfile import ZipFile, ZIP_DEFLATED
+
+P_SOURCES = ("ncdc-gts", "ncdc6310", "usaf-ds3", "cdmp-amr", "")
+NP_SOURCES = ("ncdc-gts", "ncdc6309", "cdmp-usm", "")
+
+
+def _field(value: int, width: int, missing: float, removed: float) -> str:
+    draw = random.random()
+    if draw < missing:
+        value = -9999
+    elif draw < missing + removed:
+        value = -8888
+    return f"{value:>{width}}"
+
+
+def _header(station: str, obstime, nlevels: int) -> str:
+    year, month, day, hour = obstime
+    reltime = random.choice((f"{hour:02d}{random.randint(0, 59):02d}", f"{hour:02d}99", "9999"))
+    if random.random() < 0.05:
+        hour = 99  # missing observation hour
+    p_src, np_src = random.choice(P_SOURCES), random.choice(NP_SOURCES)
+    return (f"#{station} {year:4d} {month:02d} {day:02d} {hour:02d} {reltime} {nlevels:4d} "
+            f"{p_src:<8} {np_src:<8} {259167:7d} {-974167:8d}\n")
+
+
+def _level(index: int, nlevels: int, hires: bool, missing: float, removed: float) -> str:
+    major = 1 if not hires and index % 3 == 0 else 2
+    minor = 1 if index == 0 else (2 if index == nlevels // 3 else 0)
+    if hires:
+        # elapsed time (MMSS) always reported by high-resolution radiosondes
+        seconds = 60 + index * 3000 // max(nlevels, 1)
+        elapsed = f"{seconds // 60 * 100 + seconds % 60:>5}"
+    else:
+        # MMSS from the first minute on, as parse_level reads 1 digit times as invalid
+        elapsed = _field(random.randint(1, 59)*100 + random.randint(0, 59), 5, 0.6, 0.0)
+    pressure = f"{max(100000 - index * 100000 // max(nlevels, 1), 100):>6}"
+    if random.random() < missing / 4:
+        pressure = " -9999"
+    return (f"{major}{minor} {elapsed} {pressure}{random.choice(' AB')}"
+            f"{_field(index * 30000 // max(nlevels, 1), 5, missing, removed)}{random.choice(' AB')}"
+            f"{_field(random.randint(-700, 350), 5, missing, removed)}{random.choice(' AB')}"
+            f"{_field(random.randint(0, 1000), 5, missing, removed)} "
+            f"{_field(random.randint(0, 400), 5, missing, removed)} "
+            f"{_field(random.randint(0, 360), 5, missing, removed)} "
+            f"{_field(random.randint(0, 600), 5, missing, removed)}\n")
+
+
+def generate(filename: str,
+             soundings=10000,
+             station="USM00072250",
+             hires=0.05,
+             missing=0.15,
+             removed=0.02,
+             seed=0) -> int:
+    """ Writes a synthetic IGRA v2 file, returns its number of lines
+
+    hires is the share of high-resolution soundings (thousands of levels),
+    missing and removed the share of -9999 and -8888 values.
+    """
+    random.seed(seed)
+    lines = 0
+    with open(filename, "w", encoding="utf-8") as f:
+        for i in range(soundings):
+            high = random.random() < hires
+            nlevels = random.randint(2000, 6000) if high else random.randint(5, 120)
+            day = i // 2
+            obstime = (1990 + day // 336, day // 28 % 12 + 1, day % 28 + 1, (i % 2) * 12)
+            f.write(_header(station, obstime, nlevels))
+            f.writelines(_level(j, nlevels, high, missing, removed) for j in range(nlevels))
+            lines += nlevels + 1
+    return lines
+
+
+def compress(filename: str):
+    """ Writes gzip and zip copies next to filename """
+    with open(filename, "rb") as src, gzip.open(filename + ".gz", "wb") as dst:
+        dst.write(src.read())
+    with ZipFile(filename + ".zip", "w", ZIP_DEFLATED) as zf:
+        zf.write(filename, os.path.basename(filename))
+
+
+def main():
+    args = argparse.ArgumentParser(description="generates a synthetic IGRA v2 data file")
+    args.add_argument("filename")
+    args.add_argument("--soundings", type=int, default=10000)
+    args.add_argument("--hires", type=float, default=0.05, help="share of high-resolution soundings")
+    args.add_argument("--missing", type=float, default=0.15, help="share of missing values")
+    args.add_argument("--removed", type=float, default=0.02, help="share of removed values")
+    args.add_argument("--seed", type=int, default=0)
+    args.add_argument("--compress", action="store_true", help="also write .gz and .zip copies")
+    args = args.parse_args()
+    lines = generate(args.filename, args.soundings, hires=args.hires,
+                     missing=args.missing, removed=args.removed, seed=args.seed)
+    if args.compress:
+        compress(args.filename)
+    print(f"{args.filename} : {args.soundings} soundings, {lines} lines")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timezone
+from pigra.parser import IgraParser
+
+
+def main():
+
+    start = datetime(1948, 3, 1, tzinfo=timezone.utc)
+    end = datetime(1948, 4, 1, tzinfo=timezone.utc)
+
+    # same as example5.py but relies on a sidecar index (ASM00094703-data.txt.zip.idx)
+    # built on first run, only matching soundings are read from the data file afterwards
+    parser = IgraParser.from_index(
+        "ASM00094703-data.txt.zip", lambda x: start <= x.obstime <= end)
+
+    for sounding in parser.parse():
+        print(sounding.header())
+
+if __name__ == '__main__':
+    main()
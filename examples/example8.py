@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from pigra.parser import IgraParser
+
+
+def main():
+    # same as example6.py without shapely : the bounding box is checked on raw
+    # headers, once per station location, soundings out of the area are not parsed
+    parser = IgraParser.from_file(
+        "ASM00094703-data.txt.zip", bbox=(113.338953078, -43.6345972634, 153.569469029, -10.6681857235))
+
+    for sounding in parser.parse():
+        print(sounding.header())
+
+    # soundings within 100 km of Sydney
+    parser = IgraParser.from_file("ASM00094703-data.txt.zip", near=(-33.87, 151.21, 100))
+    print(f"{len(list(parser.parse()))} sounding(s) near Sydney")
+
+
+if __name__ == '__main__':
+    main()
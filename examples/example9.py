@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+from pigra.parser import IgraParser
+from pigra.filters import Filter
+
+
+def main():
+
+    # same as example5.py with a declarative filter : evening soundings of 1948, March
+    # criteria are checked on raw header lines, other soundings are never parsed
+    f_match = Filter(start=datetime(1948, 3, 1), end=datetime(1948, 4, 1), hours=[21, 22])
+    parser = IgraParser.from_file("ASM00094703-data.txt.zip", f_match)
+
+    for sounding in parser.parse():
+        print(sounding.header())
+
+if __name__ == '__main__':
+    main()
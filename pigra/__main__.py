@@ -1,23 +1,79 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
+import io
+import os
+import stat
 import sys
-from zipfile import ZipFile
-from io import TextIOWrapper
-from datetime import datetime, timezone
-from typing import Iterable
+
+from typing import Generator, List, Optional
 
 from pigra.parser import IgraParser
-from pigra.utils import jsonfmt
+from pigra.utils import json_array, ndjson, stream_position
+
+
+def soundings(filenames: List[str], stats: IgraParser.Stats, progress=None, interval=5.0) -> Generator:
+    # soundings of all files in turn (standard input if none), stats merged at the end of each file
+    inputs: List[Optional[str]] = [*filenames] or [None]
+    for filename in inputs:
+        options = {"hook": progress, "hook_interval": interval} if progress else {}
+        if filename is None:
+            parser = IgraParser(**options)
+        else:
+            parser = IgraParser.from_file(filename, **options)
+        if progress:
+            progress.next(lambda: stream_position(parser.stream))
+        yield from parser.parse()
+        stats.__dict__.update((stats + parser.stats).__dict__)
+        if progress:
+            progress.next(lambda: 0, parser.stats, _size(filename) or 0)
+
+
+def _size(filename: Optional[str]) -> Optional[int]:
+    # input size, None when reading from a pipe
+    try:
+        if filename is None:
+            info = os.fstat(sys.stdin.fileno())
+            return info.st_size if stat.S_ISREG(info.st_mode) else None
+        return os.path.getsize(filename)
+    except (OSError, ValueError):
+        return None
 
 
 def main():
-    parser = IgraParser()
-    jsonfmt("[")  # open json array
-    for sounding in parser.parse():
-        jsonfmt(sounding.to_json(), indentlvl=1)
-    jsonfmt("]")  # close json array
-    print(parser.stats, file=sys.stderr)
+    args = argparse.ArgumentParser(prog="pigra", description="IGRA v2 soundings to json, parquet or arrow")
+    args.add_argument("filenames", nargs="*", help="IGRA files, plain or gz/zip (standard input if none)")
+    args.add_argument("--format", choices=("json", "ndjson", "parquet", "arrow"), default="json",
+                      help="json array (default), one json sounding per line, or parquet/arrow tables")
+    args.add_argument("--output", help="output directory of parquet/arrow tables")
+    args.add_argument("--progress", type=float, nargs="?", const=5.0, metavar="SECONDS",
+                      help="reports progress on stderr every SECONDS (default 5)")
+    args.add_argument("--progress-json", action="store_true",
+                      help="progress reported as json records")
+    args = args.parse_args()
+    progress = None
+    if args.progress is not None or args.progress_json:
+        from pigra.progress import Progress
+        sizes = [_size(x) for x in args.filenames or [None]]
+        progress = Progress(None if None in sizes else sum(sizes), machine=args.progress_json)
+    stats = IgraParser.Stats()
+    records = soundings(args.filenames, stats, progress, 5.0 if args.progress is None else args.progress)
+    if args.format in ("parquet", "arrow"):
+        if not args.output:
+            sys.exit(f"--output directory required for {args.format} format")
+        from pigra.arrow import export
+        export(records, args.output, args.format)
+        print(stats, file=sys.stderr)
+        return
+    out = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", write_through=False) \
+        if hasattr(sys.stdout, "buffer") else sys.stdout
+    if args.format == "ndjson":
+        ndjson((sounding.to_json(indent=None) for sounding in records), out)
+    else:
+        json_array((sounding.to_json() for sounding in records), out)
+    out.flush()
+    print(stats, file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Apache Arrow / Parquet export of soundings (requires pyarrow and numpy)
+# pip install pyarrow numpy
+
+import os
+
+from array import array
+from typing import Iterable
+
+import numpy as np
+import pyarrow as pa
+
+from pigra.constants import P_SRC, NP_SRC, QualityFlag
+from pigra.sounding import Sounding
+
+# quality flags are dictionary encoded with the lowercase names used in json output
+FLAG_NAMES = pa.array([x.name.lower() for x in QualityFlag])
+# datasources as well, dictionaries must stay the same across the batches of an IPC file
+P_SRC_NAMES = pa.array([x.name.lower() for x in P_SRC])
+NP_SRC_NAMES = pa.array([x.name.lower() for x in NP_SRC])
+_DICTIONARY = pa.dictionary(pa.int8(), pa.string())
+_KINDS = (pa.int32(), pa.int32(), pa.int32(), pa.float64(),
+          pa.float64(), pa.float64(), pa.int32(), pa.float64())
+
+SOUNDING_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("station", pa.dictionary(pa.int32(), pa.string())),
+    ("obstime", pa.timestamp("s", tz="UTC")),
+    ("reltime", pa.time32("s")),
+    ("nlevels", pa.int32()),
+    ("datasource_p", _DICTIONARY),
+    ("datasource_np", _DICTIONARY),
+    ("lat", pa.float64()),
+    ("lon", pa.float64()),
+])
+
+# elapsed is stored in seconds
+LEVEL_SCHEMA = pa.schema([("sounding_id", pa.int64()), ("major", pa.uint8()), ("minor", pa.uint8())] +
+                         [x for field, kind in zip(Sounding.Level.FIELDS, _KINDS)
+                          for x in ((field, kind), (f"{field}_flag", _DICTIONARY))])
+
+_P_SRC = {x: i for i, x in enumerate(P_SRC)}
+_NP_SRC = {x: i for i, x in enumerate(NP_SRC)}
+_NFIELDS = len(Sounding.Level.FIELDS)
+
+
+class ArrowWriter:
+    """ Streams soundings into a soundings table and a levels table joined on sounding id
+
+    Both tables are written to the `path` directory as soundings.parquet and
+    levels.parquet (soundings.arrow and levels.arrow with format="arrow").
+    Soundings are buffered until about row_group_size levels are pending, then
+    written as one row group, so memory stays bounded whatever the input size.
+    Stations are dictionary encoded in parquet only, IPC files reject the new
+    dictionary each batch would bring.
+    """
+
+    def __init__(self, path: str, format="parquet", row_group_size=1 << 16):
+        if format not in ("parquet", "arrow"):
+            raise ValueError(f"unknown format {format}")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.format = format
+        self.row_group_size = row_group_size
+        self.count = 0
+        self.schema = SOUNDING_SCHEMA if format == "parquet" else \
+            SOUNDING_SCHEMA.set(SOUNDING_SCHEMA.get_field_index("station"), pa.field("station", pa.string()))
+        self._soundings = self._open("soundings", self.schema)
+        self._levels = self._open("levels", LEVEL_SCHEMA)
+        self._clear()
+
+    def _open(self, name: str, schema: pa.Schema):
+        filename = os.path.join(self.path, f"{name}.{self.format}")
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(filename, schema)
+        return pa.ipc.new_file(filename, schema)
+
+    def _clear(self):
+        self._headers = []
+        self._ids = array("q")
+        self._majors = bytearray()
+        self._minors = bytearray()
+        self._values = array("d")
+        self._flags = bytearray()
+
+    def write(self, sounding: Sounding):
+        self._headers.append(sounding)
+        levels = sounding.levels
+        if isinstance(levels, list):
+            for level in levels:
+                self._majors.append(level.major.value)
+                self._minors.append(level.minor.value)
+                self._values.extend(level._values)
+                self._flags.extend(level._flags)
+        else:
+            # columnar levels
+            self._majors.extend(levels["major"].tobytes())
+            self._minors.extend(levels["minor"].tobytes())
+            fields = Sounding.Level.FIELDS
+            self._values.frombytes(np.stack([levels[x] for x in fields], axis=1).tobytes())
+            self._flags.extend(np.stack([levels[f"{x}_flag"] for x in fields], axis=1).tobytes())
+        self._ids.extend([self.count]*len(levels))
+        self.count += 1
+        if len(self._ids) >= self.row_group_size:
+            self.flush()
+
+    def write_all(self, soundings: Iterable[Sounding]):
+        for sounding in soundings:
+            self.write(sounding)
+
+    def flush(self):
+        if not self._headers:
+            return
+        self._soundings.write_table(self._sounding_table())
+        self._levels.write_table(self._level_table())
+        self._clear()
+
+    def _sounding_table(self) -> pa.Table:
+        headers = self._headers
+        first = self.count - len(headers)
+        return pa.table([
+            pa.array(range(first, self.count), pa.int64()),
+            pa.array([x.station for x in headers], self.schema.field("station").type),
+            pa.array([x.obstime for x in headers], SOUNDING_SCHEMA.field("obstime").type),
+            pa.array([x.reltime for x in headers], SOUNDING_SCHEMA.field("reltime").type),
+            pa.array([x.nlevels for x in headers], pa.int32()),
+            pa.DictionaryArray.from_arrays(pa.array([_P_SRC.get(x.datasource_p) for x in headers], pa.int8()),
+                                           P_SRC_NAMES),
+            pa.DictionaryArray.from_arrays(pa.array([_NP_SRC.get(x.datasource_np) for x in headers], pa.int8()),
+                                           NP_SRC_NAMES),
+            pa.array([x.location.lat for x in headers], pa.float64()),
+            pa.array([x.location.lon for x in headers], pa.float64()),
+        ], schema=self.schema)
+
+    def _level_table(self) -> pa.Table:
+        values = np.frombuffer(self._values, dtype=np.float64).reshape(-1, _NFIELDS)
+        flags = np.frombuffer(bytes(self._flags), dtype=np.int8).reshape(-1, _NFIELDS)
+        columns = [pa.array(np.frombuffer(self._ids, dtype=np.int64)),
+                   pa.array(np.frombuffer(bytes(self._majors), dtype=np.uint8)),
+                   pa.array(np.frombuffer(bytes(self._minors), dtype=np.uint8))]
+        for i, kind in enumerate(_KINDS):
+            missing = np.isnan(values[:, i])
+            column = values[:, i]
+            if kind != pa.float64():
+                column = np.where(missing, 0, column).astype(np.int32)
+            columns.append(pa.array(column, kind, mask=missing))
+            columns.append(pa.DictionaryArray.from_arrays(np.ascontiguousarray(flags[:, i]), FLAG_NAMES))
+        return pa.table(columns, schema=LEVEL_SCHEMA)
+
+    def close(self):
+        self.flush()
+        self._soundings.close()
+        self._levels.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export(soundings: Iterable[Sounding], path: str, format="parquet", row_group_size=1 << 16) -> int:
+    """ Writes soundings to the path directory, returns the number of soundings """
+    with ArrowWriter(path, format, row_group_size) as writer:
+        writer.write_all(soundings)
+    return writer.count
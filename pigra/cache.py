@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# On-disk cache of parsed IGRA files (requires numpy)
+# pip install numpy
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+from contextlib import contextmanager
+from datetime import datetime, time, timezone
+from typing import BinaryIO, Dict, Generator, List, Optional, Tuple
+
+import numpy as np
+
+from pigra.columnar import FIELDS, LEVEL_DTYPE, decode_levels
+from pigra.constants import P_SRC, NP_SRC, LevelType
+from pigra.sounding import Location, Sounding
+
+CACHE_VERSION = 2
+CACHE_SIZE = 1 << 30  # default size bound of the cache directory (bytes)
+
+_P_SRC, _NP_SRC = tuple(P_SRC), tuple(NP_SRC)
+_P_CODES = {x: i for i, x in enumerate(_P_SRC)}
+_NP_CODES = {x: i for i, x in enumerate(_NP_SRC)}
+_NONE = 255  # blank datasource
+_MAJOR, _MINOR = {x.value: x for x in LevelType.Major}, {x.value: x for x in LevelType.Minor}
+
+# one fixed-size record per sounding, its levels are levels[start:start+count]
+HEADER_DTYPE = np.dtype([("station", "S11"), ("obstime", np.int64), ("reltime", np.int32),
+                         ("nlevels", np.int32), ("datasource_p", np.uint8), ("datasource_np", np.uint8),
+                         ("lat", np.float64), ("lon", np.float64),
+                         ("start", np.int64), ("count", np.int32), ("warnings", np.int32)])
+
+
+def default_directory() -> str:
+    return os.environ.get("PIGRA_CACHE") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "pigra")
+
+
+class CachedFile:
+    """ Parsed soundings of one file : memory-mapped header records and level arrays """
+
+    def __init__(self, headers: np.ndarray, levels: np.ndarray, lines: int, null: int, errors: int):
+        self.headers = headers
+        self.levels = levels
+        self.lines, self.null, self.errors = lines, null, errors
+
+    def __len__(self):
+        return len(self.headers)
+
+    def records(self, epoch=False) -> Generator[Tuple[Sounding, int, int, int], None, None]:
+        # (sounding without levels, levels start, levels count, bad level lines)
+        # epoch : obstime kept as an int epoch (see IgraParser epoch option)
+        # shared like parse_header does
+        stations: Dict[bytes, str] = {}
+        locations: Dict[Tuple[float, float], Location] = {}
+        for station, obstime, reltime, nlevels, p_src, np_src, lat, lon, start, count, warnings in self.headers.tolist():
+            if (location:=locations.get((lat, lon))) is None:
+                location = locations[lat, lon] = Location(lat, lon)
+            if (name:=stations.get(station)) is None:
+                name = stations[station] = station.decode("ascii")
+            yield Sounding(name,
+                           obstime if epoch else datetime.fromtimestamp(obstime, timezone.utc),
+                           None if reltime < 0 else time(reltime // 3600, reltime // 60 % 60),
+                           nlevels,
+                           None if p_src == _NONE else _P_SRC[p_src],
+                           None if np_src == _NONE else _NP_SRC[np_src],
+                           location), start, count, warnings
+
+    def levels_of(self, start: int, count: int, columnar=False):
+        levels = self.levels[start:start + count]  # copy-on-write view of the mapped file
+        if columnar:
+            return levels
+        # values and flag codes of the sounding levels in Sounding.Level layout
+        values = np.stack([levels[x] for x in FIELDS], axis=1).tobytes()
+        flags = np.stack([levels[f"{x}_flag"] for x in FIELDS], axis=1).tobytes()
+        size, packed = len(FIELDS), Sounding.Level.packed
+        return [packed(_MAJOR[major], _MINOR[minor], values[8*size*i:8*size*(i+1)], flags[size*i:size*(i+1)])
+                for i, (major, minor) in enumerate(zip(levels["major"].tolist(), levels["minor"].tolist()))]
+
+
+class ParseCache:
+    """ Directory of parsed files keyed by source path, size and mtime
+
+    Each entry is a pair of .npy files (HEADER_DTYPE records and LEVEL_DTYPE
+    levels) loaded as memory maps plus a json file of file level counters.
+    Entries are evicted least recently used first once the directory grows
+    beyond max_size bytes. Stale entries are never hit and age out the same way.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_size=CACHE_SIZE):
+        self.directory = directory or default_directory()
+        self.max_size = max_size
+
+    def key(self, filename: str) -> Optional[str]:
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        source = f"{os.path.abspath(filename)}\0{stat.st_size}\0{stat.st_mtime_ns}\0{CACHE_VERSION}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str, str]:
+        base = os.path.join(self.directory, key)
+        return base + ".json", base + ".headers.npy", base + ".levels.npy"
+
+    def load(self, filename: str) -> Optional[CachedFile]:
+        """ Cached parse of filename, None if missing or out of date """
+        if (key:=self.key(filename)) is None:
+            return None
+        meta, headers, levels = self._paths(key)
+        try:
+            with open(meta, "r", encoding="utf-8") as f:
+                counters = json.load(f)
+            cached = CachedFile(np.load(headers, mmap_mode="c"), np.load(levels, mmap_mode="c"),
+                                counters["lines"], counters["null"], counters["errors"])
+            os.utime(meta)  # most recently used
+            return cached
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def build(self, filename: str) -> Optional[CachedFile]:
+        """ Parses the whole file (no filter) and stores it, returns the cached parse """
+        if (key:=self.key(filename)) is None:
+            return None
+        headers, levels, counters = _parse(filename)
+        os.makedirs(self.directory, exist_ok=True)
+        meta, headers_path, levels_path = self._paths(key)
+        try:
+            # files written under unique temporary names, concurrent builds of an entry never mix
+            for path, array in ((headers_path, headers), (levels_path, levels)):
+                with self._temporary(path) as (f, temporary):
+                    np.save(f, array)
+                os.replace(temporary, path)
+            with self._temporary(meta) as (f, temporary):
+                f.write(json.dumps({"source": os.path.abspath(filename), **counters}).encode("utf-8"))
+            os.replace(temporary, meta)  # written last, marks the entry as valid
+        except OSError as e:
+            print(f"Cannot write cache of {filename} : {e}", file=sys.stderr)
+            return CachedFile(headers, levels, **counters)
+        self.evict()
+        return self.load(filename) or CachedFile(headers, levels, **counters)
+
+    @contextmanager
+    def _temporary(self, path: str) -> Generator[Tuple[BinaryIO, str], None, None]:
+        # binary file next to path, removed on error
+        fd, temporary = tempfile.mkstemp(dir=self.directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                yield f, temporary
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    def evict(self):
+        # least recently used entries first, until the directory fits in max_size
+        entries, total = [], 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            paths = self._paths(name[:-5])
+            try:
+                size = sum(os.path.getsize(x) for x in paths if os.path.exists(x))
+                entries.append((os.path.getmtime(paths[0]), size, paths))
+            except OSError:
+                continue
+            total += size
+        for _, size, paths in sorted(entries):
+            if total <= self.max_size:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+
+def _parse(filename: str) -> Tuple[np.ndarray, np.ndarray, dict]:
+    # columnar parse of every sounding, raw level lines decoded by batches as the parser does
+    from pigra.parser import IgraParser
+    parser = IgraParser.from_file(filename, columnar=True, lazy=True, epoch=True, cache=False)
+    records: List[tuple] = []
+    arrays: List[np.ndarray] = []
+    block: List[str] = []
+    pending: List[Tuple[Sounding, int]] = []
+    start = 0
+
+    def decode():
+        nonlocal start
+        levels, valid = decode_levels(block)
+        for sounding, levels, warnings in IgraParser._split(levels, valid, pending):
+            arrays.append(levels)
+            records.append(_record(sounding, start, len(levels), warnings))
+            start += len(levels)
+        block.clear()
+        pending.clear()
+
+    try:
+        for sounding in parser.parse():
+            block.extend(sounding.raw)
+            pending.append((sounding, len(block)))
+            if len(block) >= IgraParser.BATCH:
+                decode()
+        decode()
+    finally:
+        parser.stream.close()
+    levels = np.concatenate(arrays) if arrays else np.empty(0, LEVEL_DTYPE)
+    stats = parser.stats
+    return np.array(records, dtype=HEADER_DTYPE), levels, {"lines": stats.lines, "null": stats.null, "errors": stats.errors}
+
+
+def _record(sounding: Sounding, start: int, count: int, warnings: int) -> tuple:
+    reltime = -1 if sounding.reltime is None else sounding.reltime.hour * 3600 + sounding.reltime.minute * 60
+    return (sounding.station.encode("ascii"), sounding.epoch, reltime,
+            sounding.nlevels,
+            _NONE if sounding.datasource_p is None else _P_CODES[sounding.datasource_p],
+            _NONE if sounding.datasource_np is None else _NP_CODES[sounding.datasource_np],
+            sounding.location.lat, sounding.location.lon, start, count, warnings)
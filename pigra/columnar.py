@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Columnar decoding of IGRA v2 level records (requires numpy)
+# pip install numpy
+
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+
+from pigra.constants import QualityFlag
+
+# quality flag codes stored in the *_flag columns : QUALITY_FLAGS[code]
+QUALITY_FLAGS = tuple(QualityFlag)
+FLAG_CODES = {flag: code for code, flag in enumerate(QUALITY_FLAGS)}
+
+# measured fields in file order, each one comes with a <field>_flag column
+FIELDS = ("elapsed", "pressure", "height", "temperature",
+          "humidity", "dewpoint", "winddir", "windspeed")
+
+LEVEL_DTYPE = np.dtype([("major", np.uint8), ("minor", np.uint8)] +
+                       [(x, y) for field in FIELDS for x, y in ((field, np.float64), (f"{field}_flag", np.uint8))])
+
+LEVEL_LENGTH = 51
+
+_UNCHECKED = FLAG_CODES[QualityFlag.UNCHECKED]
+_PASSED = FLAG_CODES[QualityFlag.PASSED]
+_REMOVED = FLAG_CODES[QualityFlag.REMOVED]
+_MISSING = FLAG_CODES[QualityFlag.MISSING]
+_ERROR = FLAG_CODES[QualityFlag.ERROR]
+
+# quality flag characters found in pressure, height and temperature columns
+_FLAG_LUT = np.full(256, _ERROR, dtype=np.uint8)
+_FLAG_LUT[ord(" ")] = _UNCHECKED
+_FLAG_LUT[ord("A")] = FLAG_CODES[QualityFlag.TIERS1]
+_FLAG_LUT[ord("B")] = _PASSED
+
+# fixed-width columns : field, value start, value stop, quality flag column
+_COLUMNS = (("elapsed", 3, 8, None), ("pressure", 9, 15, 15), ("height", 16, 21, 21),
+            ("temperature", 22, 27, 27), ("humidity", 28, 33, None),
+            ("dewpoint", 34, 39, None), ("winddir", 40, 45, None), ("windspeed", 46, 51, None))
+_SCALE = np.array([10 if field in ("temperature", "humidity", "dewpoint", "windspeed") else 1
+                   for field, *_ in _COLUMNS], dtype=np.float64)
+_FLAGGED = [i for i, (*_, column) in enumerate(_COLUMNS) if column is not None]
+_FLAG_COLUMNS = [column for *_, column in _COLUMNS if column is not None]
+# value characters gathered into a (field, 6) grid, right-aligned, 5 character fields
+# padded on the left with column 2 (a blank)
+_WIDTH = 6
+_GRID = np.array([[2]*(_WIDTH-(stop-start)) + list(range(start, stop)) for _, start, stop, _ in _COLUMNS])
+_PAD = _GRID == 2
+# digit counts of the column masks
+_DIGITS = np.array([bin(mask).count("1") for mask in range(1 << _WIDTH)])
+
+
+def _records(lines: Sequence[Union[str, bytes]]) -> Tuple[np.ndarray, np.ndarray, list]:
+    """ Packs level lines into a (n, LEVEL_LENGTH) uint8 matrix, with the mask of good lengths and the packed lines """
+    records: list = [x.strip() for x in lines]
+    lengths = np.fromiter(map(len, records), dtype=np.int64, count=len(records))
+    records = [x for x in records if len(x) == LEVEL_LENGTH]
+    if records and isinstance(records[0], bytes):
+        data = b"".join(records)
+    else:
+        data = "".join(records).encode("ascii", "replace")
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, LEVEL_LENGTH), lengths == LEVEL_LENGTH, records
+
+
+def _horner(columns: np.ndarray, base: int) -> np.ndarray:
+    """ Numbers written by the last axis digits in the given base """
+    number = columns[..., 0].astype(np.int32)
+    for i in range(1, columns.shape[-1]):
+        number *= base
+        number += columns[..., i]
+    return number
+
+
+def _integers(buf: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Values of all fields, mask of the right-aligned ones (blanks, optional minus, digits) and their digit counts
+
+    Other forms int() accepts ("+31", " 12 ") are left to parse_level.
+    """
+    chars = buf[:, _GRID]
+    chars[:, _PAD] = ord(" ")
+    digits = chars - np.uint8(ord("0"))
+    isdigit = digits <= 9
+    # bit masks of the digit, blank and minus columns
+    numeric, blank, minus = (_horner(mask.view(np.uint8), 2)
+                             for mask in (isdigit, chars == ord(" "), chars == ord("-")))
+    # digits run up to the end, a minus can only stand right before them
+    ok = (((numeric | blank | minus) == (1 << _WIDTH) - 1) & (numeric > 0) & ((numeric & (numeric + 1)) == 0) &
+          ((minus == 0) | (minus == numeric + 1)))
+    values = _horner(digits * isdigit, 10).astype(np.int64)
+    values[minus > 0] *= -1
+    return values, ok, _DIGITS[numeric]
+
+
+def _elapsed(values: np.ndarray, ndigits: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Seconds and validity of MMSS elapsed times, read the way IgraParser.parse_level does (strptime "%M%S") """
+    def digit(i):  # i-th digit from the left
+        return values // 10 ** np.maximum(ndigits - 1 - i, 0) % 10
+
+    first, second, third = digit(0), digit(1), digit(2)
+    # minutes take 1 of 2 digits, 2 of 3 (1 when the first one is over 5) and 2 of 4
+    minutes = np.where(ndigits == 3, np.where(first <= 5, 2, 1), np.where(ndigits == 4, 2, 1))
+    ok = (values >= 0) & ((ndigits == 2) |
+                          ((ndigits == 3) & ((first <= 5) | (second <= 5))) |
+                          ((ndigits == 4) & (first <= 5) & (third <= 5)))
+    scale = 10 ** np.maximum(ndigits - minutes, 0)
+    return (values // scale * 60 + values % scale).astype(np.float64), ok
+
+
+def decode_levels(lines: Sequence[Union[str, bytes]]) -> Tuple[np.ndarray, np.ndarray]:
+    """ Decodes level lines, returns the structured array of valid levels and the validity mask of lines
+
+    Lines are accepted and decoded exactly like IgraParser.parse_level does.
+    All value columns are decoded in one pass, the rare lines holding other
+    forms than right-aligned integers are handed over to parse_level.
+    """
+    buf, valid, records = _records(lines)
+    major, minor = buf[:, 0] - np.uint8(48), buf[:, 1] - np.uint8(48)
+    ok = (major >= 1) & (major <= 3) & (minor <= 2)
+    values, integer, ndigits = _integers(buf)
+    # -8888/-9999 sentinels hold all the 5 characters of their column
+    removed, missing = (values == -8888) & integer, (values == -9999) & integer
+    # pressure keeps its -9999 value, its 6 characters never match the sentinel
+    removed[:, 1] = missing[:, 1] = False
+    absent = removed | missing
+    seconds, elapsed = _elapsed(values[:, 0], ndigits[:, 0])
+    integer[:, 0] &= elapsed | absent[:, 0]
+    odd = ok & ~integer.all(axis=1)
+    ok &= ~odd
+    decoded = values.astype(np.float64)
+    decoded[:, 0] = seconds
+    decoded /= _SCALE
+    decoded[absent] = np.nan
+    # explicit quality flag character right after the value, value status only otherwise
+    flags = np.full(values.shape, _PASSED, dtype=np.uint8)
+    flags[removed], flags[missing] = _REMOVED, _MISSING
+    flags[:, _FLAGGED] = _FLAG_LUT[buf[:, _FLAG_COLUMNS]]
+
+    levels = np.empty(len(buf), dtype=LEVEL_DTYPE)
+    levels["major"], levels["minor"] = major, minor
+    for i, field in enumerate(FIELDS):
+        levels[field], levels[f"{field}_flag"] = decoded[:, i], flags[:, i]
+    if odd.any():
+        from pigra.parser import IgraParser
+        for i in np.flatnonzero(odd).tolist():
+            line = records[i]
+            try:
+                levels[i] = levels_array([IgraParser.parse_level(
+                    line.decode("utf-8", "replace") if isinstance(line, bytes) else line)])[0]
+                ok[i] = True
+            except Exception:
+                pass
+    valid[valid] = ok
+    return levels[ok], valid
+
+
+def levels_array(levels) -> np.ndarray:
+    """ Sounding.Level list as a LEVEL_DTYPE structured array, columnar levels returned as is """
+    if isinstance(levels, np.ndarray):
+        return levels
+    array = np.empty(len(levels), dtype=LEVEL_DTYPE)
+    if not len(levels):
+        return array
+    array["major"] = np.fromiter((x.major.value for x in levels), dtype=np.uint8, count=len(levels))
+    array["minor"] = np.fromiter((x.minor.value for x in levels), dtype=np.uint8, count=len(levels))
+    # Sounding.Level packs its values and flags in FIELDS order with the same flag codes
+    values = np.frombuffer(b"".join(x._values.tobytes() for x in levels), dtype=np.float64).reshape(-1, len(FIELDS))
+    flags = np.frombuffer(b"".join(x._flags for x in levels), dtype=np.uint8).reshape(-1, len(FIELDS))
+    for i, field in enumerate(FIELDS):
+        array[field], array[f"{field}_flag"] = values[:, i], flags[:, i]
+    return array
+
+
+def parse_levels(lines: Sequence[Union[str, bytes]]) -> np.ndarray:
+    """ Decodes fixed-width level records into a LEVEL_DTYPE structured array
+
+    Values are read like IgraParser.parse_level does : missing or removed
+    values are NaN with their status kept in the matching flag column,
+    elapsed time in seconds as strptime "%M%S" reads it. Invalid lines are dropped.
+    """
+    return decode_levels(lines)[0]
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Derived quantities computed on whole soundings as numpy arrays (requires numpy)
+# pip install numpy
+#
+# Functions take a Sounding, a LEVEL_DTYPE structured array (columnar levels)
+# or the concatenated levels of several soundings from batch(). Units follow
+# the IGRA fields : Pa, gpm, degC, %, degC dewpoint depression, degrees, m/s.
+# Missing values are NaN and propagate to the derived quantities.
+
+from itertools import islice
+from typing import Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from pigra.columnar import FLAG_CODES, levels_array
+from pigra.constants import LevelType, QualityFlag
+from pigra.sounding import Sounding
+
+P0 = 100000.0  # reference pressure (Pa)
+KAPPA = 287.04 / 1005.7  # Rd / cp
+EPSILON = 0.622  # Rd / Rv
+ZERO_CELSIUS = 273.15
+
+# values flagged so are not used
+EXCLUDED = (QualityFlag.REMOVED, QualityFlag.MISSING, QualityFlag.ERROR)
+
+Levels = Union[Sounding, np.ndarray]
+
+
+def _levels(levels: Levels) -> np.ndarray:
+    return levels_array(levels.levels if isinstance(levels, Sounding) else levels)
+
+
+def batch(soundings: Iterable[Sounding]) -> Tuple[np.ndarray, np.ndarray]:
+    """ Levels of several soundings concatenated, with the offsets of each sounding (n+1 items) """
+    arrays = [levels_array(x.levels) for x in soundings]
+    offsets = np.zeros(len(arrays)+1, dtype=np.int64)
+    np.cumsum([len(x) for x in arrays], out=offsets[1:])
+    if not arrays:
+        return levels_array([]), offsets
+    return np.concatenate(arrays), offsets
+
+
+def valid(levels: Levels, field: str, excluded: Sequence[QualityFlag] = EXCLUDED) -> np.ndarray:
+    """ Mask of usable values of field : present and not flagged as excluded """
+    levels = _levels(levels)
+    flags = levels[f"{field}_flag"]
+    mask = ~np.isnan(levels[field])
+    for flag in excluded:
+        mask &= flags != FLAG_CODES[flag]
+    if field == "pressure":
+        mask &= levels[field] > 0  # -9999 kept by the object parser
+    return mask
+
+
+def values(levels: Levels, field: str, excluded: Sequence[QualityFlag] = EXCLUDED) -> np.ndarray:
+    """ Values of field as float64, NaN where not usable """
+    levels = _levels(levels)
+    return np.where(valid(levels, field, excluded), levels[field], np.nan)
+
+
+def saturation_vapor_pressure(temperature: np.ndarray) -> np.ndarray:
+    # Bolton (1980), degC -> Pa
+    return 611.2 * np.exp(17.67 * temperature / (temperature + 243.5))
+
+
+def dewpoint(levels: Levels) -> np.ndarray:
+    levels = _levels(levels)
+    return values(levels, "temperature") - values(levels, "dewpoint")
+
+
+def relative_humidity(levels: Levels) -> np.ndarray:
+    """ Relative humidity (%) from the dewpoint depression """
+    levels = _levels(levels)
+    return 100 * saturation_vapor_pressure(dewpoint(levels)) / saturation_vapor_pressure(values(levels, "temperature"))
+
+
+def mixing_ratio(levels: Levels) -> np.ndarray:
+    """ Water vapor mixing ratio (kg/kg) """
+    levels = _levels(levels)
+    vapor = saturation_vapor_pressure(dewpoint(levels))
+    return EPSILON * vapor / (values(levels, "pressure") - vapor)
+
+
+def potential_temperature(levels: Levels) -> np.ndarray:
+    """ Potential temperature (K) """
+    levels = _levels(levels)
+    return (values(levels, "temperature") + ZERO_CELSIUS) * (P0 / values(levels, "pressure")) ** KAPPA
+
+
+def wind_components(levels: Levels) -> Tuple[np.ndarray, np.ndarray]:
+    """ Eastward and northward wind (m/s), direction is where the wind blows from """
+    levels = _levels(levels)
+    speed, direction = values(levels, "windspeed"), np.radians(values(levels, "winddir"))
+    return -speed * np.sin(direction), -speed * np.cos(direction)
+
+
+def interpolate_height(levels: Levels, offsets: Optional[np.ndarray] = None) -> np.ndarray:
+    """ Geopotential height (gpm) with missing values interpolated linearly in log-pressure
+
+    offsets splits batch() levels into soundings, heights are never interpolated
+    across soundings nor extrapolated.
+    """
+    levels = _levels(levels)
+    if offsets is None:
+        offsets = (0, len(levels))
+    height, logp = values(levels, "height"), np.log(values(levels, "pressure"))
+    result = height.copy()
+    for start, stop in zip(offsets[:-1], offsets[1:]):
+        x, y = logp[start:stop], height[start:stop]
+        known = ~np.isnan(x) & ~np.isnan(y)
+        if known.sum() < 2:
+            continue
+        order = np.argsort(x[known])
+        xp, fp = x[known][order], y[known][order]
+        wanted = np.isnan(y) & ~np.isnan(x)
+        result[start:stop][wanted] = np.interp(x[wanted], xp, fp, left=np.nan, right=np.nan)
+    return result
+
+
+def derive(levels: Levels, offsets: Optional[np.ndarray] = None) -> np.ndarray:
+    """ All derived quantities as a structured array, one record per level """
+    levels = _levels(levels)
+    u, v = wind_components(levels)
+    quantities = (("dewpoint", dewpoint(levels)),
+                  ("relative_humidity", relative_humidity(levels)),
+                  ("mixing_ratio", mixing_ratio(levels)),
+                  ("potential_temperature", potential_temperature(levels)),
+                  ("u", u), ("v", v),
+                  ("height", interpolate_height(levels, offsets)))
+    result = np.empty(len(levels), dtype=[(x, np.float64) for x, _ in quantities])
+    for name, value in quantities:
+        result[name] = value
+    return result
+
+
+# mandatory pressure levels (Pa)
+STANDARD_LEVELS = (100000, 92500, 85000, 70000, 50000, 40000, 30000,
+                   25000, 20000, 15000, 10000, 7000, 5000, 3000, 2000, 1000)
+
+# level fields, or u/v wind components
+VARIABLES = ("height", "temperature", "dewpoint", "u", "v")
+
+
+def _variable(levels: np.ndarray, name: str) -> np.ndarray:
+    if name in ("u", "v"):
+        return wind_components(levels)["uv".index(name)]
+    return values(levels, name)
+
+
+def interpolate_levels(levels: np.ndarray,
+                       offsets: np.ndarray,
+                       pressures: Sequence[float] = STANDARD_LEVELS,
+                       variables: Sequence[str] = VARIABLES) -> np.ndarray:
+    """ batch() levels interpolated in log-pressure, (n_soundings, n_levels, n_variables) array
+
+    A standard level (LevelType.Major.STANDARD) at the exact pressure is taken
+    as is, other values are interpolated between the nearest usable levels
+    of the same sounding, never extrapolated (NaN).
+    """
+    nsoundings = len(offsets) - 1
+    result = np.full((nsoundings, len(pressures), len(variables)), np.nan)
+    if not len(levels):
+        return result
+    sounding = np.repeat(np.arange(nsoundings), np.diff(offsets))
+    logp = np.log(values(levels, "pressure"))
+    # soundings are laid out one after the other on a single sorted key
+    span = np.log(1e6)
+    targets = (np.arange(nsoundings)[:, None] * span + np.log(np.asarray(pressures, dtype=np.float64))).ravel()
+    other = levels["major"] != LevelType.Major.STANDARD.value
+    for i, name in enumerate(variables):
+        value = _variable(levels, name)
+        usable = ~np.isnan(value) & ~np.isnan(logp)
+        keys, value, owner = sounding[usable] * span + logp[usable], value[usable], sounding[usable]
+        order = np.lexsort((other[usable], keys))  # standard levels first on equal pressures
+        keys, value, owner = keys[order], value[order], owner[order]
+        if not len(keys):
+            continue
+        upper = np.searchsorted(keys, targets)
+        found = np.minimum(upper, len(keys) - 1)
+        exact = keys[found] == targets
+        lower = np.maximum(upper - 1, 0)
+        target_owner = np.repeat(np.arange(nsoundings), len(pressures))
+        inside = (upper > 0) & (upper < len(keys)) & (owner[lower] == target_owner) & (owner[found] == target_owner)
+        weight = np.divide(targets - keys[lower], keys[found] - keys[lower],
+                           out=np.zeros(len(targets)), where=inside & ~exact)
+        interpolated = value[lower] + weight * (value[found] - value[lower])
+        column = np.where(exact, value[found], np.where(inside, interpolated, np.nan))
+        result[:, :, i] = column.reshape(nsoundings, len(pressures))
+    return result
+
+
+def interpolate_chunks(soundings: Iterable[Sounding],
+                       pressures: Sequence[float] = STANDARD_LEVELS,
+                       variables: Sequence[str] = VARIABLES,
+                       chunk=1024) -> Iterable[Tuple[list, np.ndarray]]:
+    """ Yields soundings by chunks along with their interpolate_levels() array """
+    soundings = iter(soundings)
+    while True:
+        block = list(islice(soundings, chunk))
+        if not block:
+            return
+        yield block, interpolate_levels(*batch(block), pressures, variables)
+
+
+def interpolate(soundings: Iterable[Sounding],
+                pressures: Sequence[float] = STANDARD_LEVELS,
+                variables: Sequence[str] = VARIABLES,
+                chunk=1024) -> np.ndarray:
+    """ Soundings interpolated to pressure levels, (n_soundings, n_levels, n_variables) array
+
+    Soundings are consumed by chunks, only the dense result is kept in memory.
+    """
+    arrays = [x for _, x in interpolate_chunks(soundings, pressures, variables, chunk)]
+    if not arrays:
+        return np.empty((0, len(pressures), len(variables)))
+    return np.concatenate(arrays)
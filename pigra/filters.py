@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pigra.constants import P_SRC, NP_SRC
+from pigra.sounding import Location, Sounding
+from pigra.spatial import SpatialFilter
+
+# IGRA file names start with the station id : USM00072250-data.txt.zip
+_STATION_FILE = re.compile(r"^[A-Z0-9]{11}-")
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _key(value: datetime) -> str:
+    # raw header date "YYYY MM DD HH"
+    return f"{value.year:04d} {value.month:02d} {value.day:02d} {value.hour:02d}"
+
+
+class Filter:
+    """ Declarative sounding filter, usable as f_match
+
+    All given criteria must match : station ids, obstime range (inclusive,
+    naive datetimes are UTC), observation hours, geobox and/or radius (see
+    SpatialFilter), P_SRC/NP_SRC datasources (None for blank) and minimum
+    nlevels. Criteria are compiled into fixed-width checks on raw header
+    lines (match_header), run by the parser before parse_header so rejected
+    headers never build a Sounding. Missing observation hours (99) read as
+    00, like parse_header does.
+    """
+
+    def __init__(self,
+                 stations: Optional[Iterable[str]] = None,
+                 start: Optional[datetime] = None,
+                 end: Optional[datetime] = None,
+                 hours: Optional[Iterable[int]] = None,
+                 bbox: Optional[Tuple[float, float, float, float]] = None,
+                 near: Optional[Tuple[float, float, float]] = None,
+                 datasource_p: Optional[Iterable[Optional[P_SRC]]] = None,
+                 datasource_np: Optional[Iterable[Optional[NP_SRC]]] = None,
+                 min_levels: Optional[int] = None):
+        self.stations = None if stations is None else frozenset(stations)
+        self.start = None if start is None else _utc(start)
+        self.end = None if end is None else _utc(end)
+        self.hours = None if hours is None else frozenset(hours)
+        self.spatial = SpatialFilter(bbox, near) if bbox is not None or near is not None else None
+        self.datasource_p = None if datasource_p is None else frozenset(datasource_p)
+        self.datasource_np = None if datasource_np is None else frozenset(datasource_np)
+        self.min_levels = min_levels
+        self._compile()
+
+    def _compile(self):
+        checks: List[Callable[[str], bool]] = []
+        if self.stations is not None:
+            stations = self.stations
+            checks.append(lambda hdr: hdr[1:12] in stations)
+        if self.start is not None or self.end is not None:
+            # observation times compare as "YYYY MM DD HH" strings, obstime holds whole hours
+            start = None
+            if self.start is not None:
+                start = self.start.replace(minute=0, second=0, microsecond=0)
+                start = _key(start if start == self.start else start + timedelta(hours=1))
+            end = None if self.end is None else _key(self.end)
+
+            def obstime(hdr: str) -> bool:
+                key = hdr[13:26]
+                if key[11:] == "99":
+                    key = key[:11] + "00"
+                return (start is None or key >= start) and (end is None or key <= end)
+            checks.append(obstime)
+        if self.hours is not None:
+            hours = frozenset(f"{x:02d}" for x in self.hours) | ({"99"} if 0 in self.hours else set())
+            checks.append(lambda hdr: hdr[24:26] in hours)
+        if self.spatial is not None:
+            checks.append(self.spatial.match_header)
+        if self.datasource_p is not None:
+            sources_p = frozenset(f"{'' if x is None else x.value:<8}" for x in self.datasource_p)
+            checks.append(lambda hdr: hdr[37:45] in sources_p)
+        if self.datasource_np is not None:
+            sources_np = frozenset(f"{'' if x is None else x.value:<8}" for x in self.datasource_np)
+            checks.append(lambda hdr: hdr[46:54] in sources_np)
+        if self.min_levels is not None:
+            min_levels = self.min_levels
+            checks.append(lambda hdr: hdr[32:36].strip().isdigit() and int(hdr[32:36]) >= min_levels)
+        self._checks = tuple(checks)
+
+    def match_header(self, hdr: str) -> bool:
+        """ Checks a raw header line, must be 71 characters long to be checked """
+        if len(hdr) < 71:
+            return True  # left to the parser which reports the error
+        for check in self._checks:
+            if not check(hdr):
+                return False
+        return True
+
+    def __call__(self, sounding: Sounding) -> bool:
+        if self.stations is not None and sounding.station not in self.stations:
+            return False
+        if self.start is not None and sounding.obstime < self.start:
+            return False
+        if self.end is not None and sounding.obstime > self.end:
+            return False
+        if self.hours is not None and sounding.obstime.hour not in self.hours:
+            return False
+        if self.spatial is not None and not self.spatial(sounding):
+            return False
+        if self.datasource_p is not None and sounding.datasource_p not in self.datasource_p:
+            return False
+        if self.datasource_np is not None and sounding.datasource_np not in self.datasource_np:
+            return False
+        if self.min_levels is not None and sounding.nlevels < self.min_levels:
+            return False
+        return True
+
+    def prune(self, filenames: Iterable[str], stations: Optional[Dict[str, Location]] = None) -> List[str]:
+        """ Drops station files of other stations (by file name) or out of the area """
+        filenames = list(filenames)
+        if self.stations is not None:
+            filenames = [x for x in filenames
+                         if not _STATION_FILE.match(name:=os.path.basename(x)) or name[:11] in self.stations]
+        if self.spatial is not None:
+            filenames = self.spatial.prune(filenames, stations)
+        return filenames
+
+    def __getstate__(self):
+        # compiled checks are closures, rebuilt on the other side
+        state = self.__dict__.copy()
+        del state["_checks"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
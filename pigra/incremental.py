@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import sys
+
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Optional
+
+CHECKPOINT_SUFFIX = ".ckpt"
+
+
+@dataclass
+class Checkpoint:
+    """ Resume point of an incrementally parsed file : end of the last complete sounding """
+    filename: str
+    offset: int = 0
+    stats: Optional[object] = field(default=None)  # IgraParser.Stats of the data before offset
+
+    @classmethod
+    def load(cls, filename: str):
+        from pigra.parser import IgraParser
+        checkpoint = cls(filename, 0, IgraParser.Stats())
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            stats = state["stats"]
+            stats["elapsed"] = timedelta(seconds=stats["elapsed"])
+            checkpoint.offset, checkpoint.stats = int(state["offset"]), IgraParser.Stats(**stats)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Cannot load checkpoint {filename}, starting over : {e}", file=sys.stderr)
+        return checkpoint
+
+    def save(self):
+        stats = {k: v for k, v in self.stats.__dict__.items() if k != "profile"}
+        stats["elapsed"] = stats["elapsed"].total_seconds()
+        temporary = self.filename + ".tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump({"offset": self.offset, "stats": stats}, f)
+            os.replace(temporary, self.filename)  # never leaves a half written checkpoint
+        except OSError as e:
+            print(f"Cannot save checkpoint {self.filename} : {e}", file=sys.stderr)
+
+
+def complete_length(data: bytes) -> int:
+    """ Length of data holding complete soundings only
+
+    The last record is held back while it has fewer level lines than the
+    nlevels of its header or misses its final newline. Records followed by
+    another header are complete.
+    """
+    start = data.rfind(b"\n#") + 1
+    if start == 0 and data[:1] != b"#":
+        # no header, lines outside any record
+        return len(data) if data.endswith(b"\n") else data.rfind(b"\n") + 1
+    if not data.endswith(b"\n"):
+        return start
+    eol = data.find(b"\n", start)
+    try:
+        nlevels = int(data[start+32:start+36])
+    except ValueError:
+        return len(data)  # bad header, left to the parser which reports it
+    levels = data.count(b"\n", eol + 1)
+    return len(data) if levels >= nlevels else start
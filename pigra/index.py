@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+from dataclasses import dataclass
+from io import StringIO
+from typing import Callable, Generator, List, Optional
+
+from pigra.sounding import Sounding
+from pigra.utils import stream_from
+
+INDEX_SUFFIX = ".idx"
+INDEX_SIGNATURE = "pigra-index"
+INDEX_VERSION = 1
+
+
+class IgraIndex:
+    """ Sidecar index of an IGRA file : byte offset and length of each sounding
+
+    Offsets refer to the uncompressed data, so gz/zip files are still
+    decompressed up to the selected records but never parsed.
+    """
+
+    @dataclass
+    class Entry:
+        offset: int
+        length: int
+        header: str
+
+    def __init__(self, filename: str, entries: List[Entry]):
+        self.filename = filename
+        self.entries = entries
+        stat = os.stat(filename)
+        self.size, self.mtime = stat.st_size, stat.st_mtime_ns
+
+    @classmethod
+    def build(cls, filename: str):
+        entries: List[IgraIndex.Entry] = []
+        offset = 0
+        if (stream:=stream_from(filename, binary=True)) is None:
+            raise OSError(f"cannot read {filename}")
+        with stream as f:
+            for line in f:
+                if line[:1] == b'#':
+                    if entries:
+                        entries[-1].length = offset - entries[-1].offset
+                    entries.append(IgraIndex.Entry(
+                        offset, 0, line.decode("utf-8").strip()))
+                offset += len(line)
+        if entries:
+            entries[-1].length = offset - entries[-1].offset
+        return cls(filename, entries)
+
+    @classmethod
+    def load(cls, filename: str, index_filename: Optional[str] = None):
+        """ Loads the sidecar index, returns None if missing or out of date """
+        index_filename = index_filename or filename + INDEX_SUFFIX
+        try:
+            with open(index_filename, "r", encoding="utf-8") as f:
+                signature, version, size, mtime = f.readline().split("\t")
+                if signature != INDEX_SIGNATURE or int(version) != INDEX_VERSION:
+                    return None
+                index = cls(filename, [])
+                if (index.size, index.mtime) != (int(size), int(mtime)):
+                    return None
+                for line in f:
+                    offset, length, header = line.rstrip("\n").split("\t")
+                    index.entries.append(IgraIndex.Entry(
+                        int(offset), int(length), header))
+                return index
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def open(cls, filename: str, index_filename: Optional[str] = None):
+        """ Loads the sidecar index, builds and saves it first if needed """
+        index = cls.load(filename, index_filename)
+        if index is None:
+            index = cls.build(filename)
+            index.save(index_filename)
+        return index
+
+    def save(self, index_filename: Optional[str] = None):
+        index_filename = index_filename or self.filename + INDEX_SUFFIX
+        try:
+            with open(index_filename, "w", encoding="utf-8") as f:
+                f.write(
+                    f"{INDEX_SIGNATURE}\t{INDEX_VERSION}\t{self.size}\t{self.mtime}\n")
+                for entry in self.entries:
+                    f.write(f"{entry.offset}\t{entry.length}\t{entry.header}\n")
+        except OSError as e:
+            print(f"Cannot save index {index_filename} : {e}", file=sys.stderr)
+
+    def select(self, f_match: Callable[[Sounding], bool], stats=None,
+               match_header: Optional[Callable[[str], bool]] = None) -> Generator:
+        """ Yields entries whose header matches, without reading the data file
+
+        match_header is checked on raw headers before they are parsed.
+        """
+        from pigra.parser import IgraParser
+        for entry in self.entries:
+            if match_header and not match_header(entry.header):
+                if stats:
+                    stats.records += 1
+                    stats.filtered += 1
+                continue
+            try:
+                sounding = IgraParser.parse_header(entry.header)
+            except Exception:
+                if stats:
+                    stats.errors += 1
+                continue
+            if f_match(sounding):
+                yield entry
+            elif stats:
+                stats.records += 1
+                stats.filtered += 1
+
+    def lines(self, entries) -> Generator:
+        """ Yields the text lines of the given entries, seeking straight to each one """
+        if (stream:=stream_from(self.filename, binary=True)) is None:
+            raise OSError(f"cannot read {self.filename}")
+        with stream as f:
+            position = 0
+            for entry in entries:
+                if entry.offset != position:
+                    f.seek(entry.offset)
+                data = f.read(entry.length)
+                position = entry.offset + len(data)
+                yield from StringIO(data.decode("utf-8"), newline=None)
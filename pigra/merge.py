@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import heapq
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Generator, Iterable, List, Optional, Sequence, Tuple
+
+from pigra.parser import IgraParser
+from pigra.sounding import Sounding
+
+SYNOPTIC_HOURS = (0, 6, 12, 18)
+BUFFER_SIZE = 1 << 16  # read size of each input file
+
+
+def obstime_key(sounding: Sounding) -> int:
+    # epoch seconds, no datetime built for soundings parsed with epoch=True
+    return sounding.epoch
+
+
+def synoptic_time(epoch: int, hours: Sequence[int] = SYNOPTIC_HOURS) -> int:
+    """ Nearest synoptic time (epoch seconds) of an epoch, the earliest one on a tie """
+    day = epoch - epoch % 86400
+    candidates = [day + (hours[-1]-24)*3600] + [day + x*3600 for x in hours] + [day + (hours[0]+24)*3600]
+    return min(candidates, key=lambda x: (abs(epoch-x), x))
+
+
+class MergedIgraParser:
+    """ Streaming k-way merge of several parsers in obstime order
+
+    Each input must be sorted by obstime, as IGRA station files are. A heap
+    holds the next sounding of every input, so memory is bounded by the
+    number of inputs (and their open files), not by the data size.
+    Soundings of equal obstime come in input order. Stats are merged at the
+    end, elapsed is the wall-clock time of the merge.
+    """
+
+    def __init__(self, parsers: Iterable[IgraParser], key: Callable[[Sounding], int] = obstime_key):
+        self.parsers: List[IgraParser] = list(parsers)
+        self.key = key
+        self.stats = IgraParser.Stats()
+
+    def parse(self) -> Generator:
+        start = datetime.now()
+        key = self.key
+        heap: List[Tuple[int, int, Sounding]] = []
+        streams = [x.parse() for x in self.parsers]
+        for i, stream in enumerate(streams):
+            if (sounding:=next(stream, None)) is not None:
+                heap.append((key(sounding), i, sounding))
+        heapq.heapify(heap)
+        while heap:
+            _, i, sounding = heap[0]
+            yield sounding
+            if (sounding:=next(streams[i], None)) is not None:
+                heapq.heapreplace(heap, (key(sounding), i, sounding))
+            else:
+                heapq.heappop(heap)
+        stats = IgraParser.Stats()
+        for parser in self.parsers:
+            stats = stats + parser.stats
+        stats.elapsed = datetime.now()-start
+        self.stats = stats
+
+    def reset(self):
+        for parser in self.parsers:
+            parser.reset()
+        self.stats = IgraParser.Stats()
+
+    def windows(self,
+                hours: Sequence[int] = SYNOPTIC_HOURS,
+                tolerance: timedelta = timedelta(hours=1)) -> Generator[Tuple[datetime, List[Sounding]], None, None]:
+        """ (synoptic time, soundings within ±tolerance of it) groups, in time order
+
+        Soundings farther than tolerance from every synoptic time are skipped.
+        Only the soundings of the current window are held in memory.
+        """
+        hours = sorted(hours)
+        tolerance = tolerance.total_seconds()
+        current: Optional[int] = None
+        group: List[Sounding] = []
+        for sounding in self.parse():
+            epoch = sounding.epoch
+            synoptic = synoptic_time(epoch, hours)
+            if abs(epoch-synoptic) > tolerance:
+                continue
+            if synoptic != current:
+                if current is not None:
+                    yield datetime.fromtimestamp(current, timezone.utc), group
+                current, group = synoptic, []
+            group.append(sounding)
+        if current is not None:
+            yield datetime.fromtimestamp(current, timezone.utc), group
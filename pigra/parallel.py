@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+from collections import deque
+from datetime import timedelta
+from multiprocessing import Pool, Queue, Semaphore
+from time import perf_counter
+from typing import Callable, Deque, Dict, Generator, Iterable, List, Optional, Tuple
+
+from pigra.parser import IgraParser, SoundingException
+from pigra.sounding import Location, Sounding
+from pigra.spatial import SpatialFilter
+
+
+def match_all(sounding: Sounding) -> bool:
+    # picklable default filter (lambdas cannot be sent to worker processes)
+    return True
+
+
+_queue = None  # worker side message queue, inherited at pool start
+_credits = None  # worker side per slot semaphores bounding messages in flight
+
+
+def _init_worker(queue, credits):
+    global _queue, _credits
+    _queue, _credits = queue, credits
+
+
+def _put(slot, soundings, stats):
+    _credits[slot].acquire()
+    _queue.put((slot, soundings, stats))
+
+
+def byte_ranges(filename: str, chunk_size: int) -> List[Tuple[str, int, Optional[int]]]:
+    """ Splits an uncompressed file into ranges of about chunk_size bytes starting at a # header """
+    size = os.path.getsize(filename)
+    ranges: List[Tuple[str, int, Optional[int]]] = []
+    start = 0
+    with open(filename, "rb") as f:
+        while start + chunk_size < size:
+            # next header after start + chunk_size
+            position = start + chunk_size
+            f.seek(position - 1)
+            while position < size:
+                data = f.read(1 << 16)
+                if (found:=data.find(b"\n#")) >= 0:
+                    position += found
+                    break
+                position = size if len(data) < 1 << 16 else position + len(data) - 1
+                f.seek(position - 1)
+            if position >= size:
+                break
+            ranges.append((filename, start, position))
+            start = position
+    ranges.append((filename, start, None))
+    return ranges
+
+
+def _parse_task(slot, task, f_match, verbose, options, batch):
+    # streams soundings back by batches, then the stats (or the error)
+    try:
+        filename, start, stop = task
+        if start == 0 and stop is None:
+            parser = IgraParser.from_file(filename, f_match, verbose, **options)
+        else:
+            # byte range of an uncompressed file, aligned on # headers
+            with open(filename, "rb") as f:
+                f.seek(start)
+                data = f.read(-1 if stop is None else stop - start)
+            parser = IgraParser.from_buffer(data, f_match, verbose, **options)
+        soundings: List[Sounding] = []
+        for sounding in parser.parse():
+            soundings.append(sounding)
+            if len(soundings) >= batch:
+                _put(slot, soundings, None)
+                soundings = []
+        _put(slot, soundings, parser.stats)
+    except Exception as e:
+        _put(slot, [], SoundingException(f"cannot parse {task} : {e}"))
+
+
+class ParallelIgraParser:
+    """ Parses several IGRA files across a pool of worker processes
+
+    f_match is applied inside the workers, so it must be picklable (a
+    module-level function, not a lambda). Soundings are streamed back by
+    batches, each running task holds at most `prefetch` batches in memory.
+    With ordered=True files are parsed in station order (IGRA files hold
+    one station each, sorted by obstime) and soundings come back file
+    after file, in file order. Otherwise files come back interleaved, but
+    the soundings of one file always keep their file order. With bbox/near options or a Filter f_match,
+    files of other stations or known to be out of the area (sidecar index
+    or stations locations, see pigra.spatial.load_stations) are pruned
+    before being opened.
+    """
+
+    def __init__(self,
+                 filenames: Iterable[str],
+                 f_match: Callable[[Sounding], bool] = match_all,
+                 verbose=False,
+                 workers=None,
+                 ordered=False,
+                 batch=256,
+                 prefetch=4,
+                 chunk_size=1 << 26,
+                 stations: Optional[Dict[str, Location]] = None,
+                 **options):
+        self.filenames = list(filenames)
+        self.f_match = f_match
+        self.verbose = verbose
+        self.workers = workers or os.cpu_count() or 1
+        self.ordered = ordered
+        self.batch = batch
+        self.prefetch = prefetch
+        self.chunk_size = chunk_size
+        self.stations = stations
+        self.options = options  # IgraParser options (columnar, skip_filtered...)
+        self.stats = IgraParser.Stats()
+
+    def tasks(self) -> List[Tuple[str, int, Optional[int]]]:
+        filenames = self.filenames
+        if self.ordered:
+            filenames = sorted(filenames, key=os.path.basename)
+        if self.options.get("bbox") is not None or self.options.get("near") is not None:
+            spatial = SpatialFilter(self.options.get("bbox"), self.options.get("near"))
+            filenames = spatial.prune(filenames, self.stations)
+        if hasattr(self.f_match, "prune"):
+            # pigra.filters.Filter : other stations files
+            filenames = self.f_match.prune(filenames, self.stations)
+        tasks: List[Tuple[str, int, Optional[int]]] = []
+        for filename in filenames:
+            if filename[-3:] == ".gz" or filename[-4:] == ".zip" or not os.path.isfile(filename):
+                tasks.append((filename, 0, None))
+            else:
+                tasks.extend(byte_ranges(filename, self.chunk_size))
+        return tasks
+
+    def parse(self) -> Generator:
+        start = perf_counter()
+        self.stats = IgraParser.Stats()
+        tasks = iter(self.tasks())
+        nslots = self.workers*2
+        queue: Queue = Queue()
+        credits = [Semaphore(self.prefetch) for _ in range(nslots)]
+        buffers: List[Deque] = [deque() for _ in range(nslots)]
+        running: Deque[int] = deque()  # slots in submission order
+        files: Dict[int, str] = {}  # file of the task of each slot
+        with Pool(self.workers, _init_worker, (queue, credits)) as pool:
+
+            def submit(slot):
+                for task in tasks:
+                    def failed(e, task=task):
+                        credits[slot].acquire()
+                        queue.put((slot, [], SoundingException(f"cannot parse {task} : {e}")))
+                    pool.apply_async(_parse_task,
+                                     (slot, task, self.f_match, self.verbose,
+                                      self.options, self.batch),
+                                     error_callback=failed)
+                    running.append(slot)
+                    files[slot] = task[0]
+                    break
+
+            def heads() -> Generator[int, None, None]:
+                # slots whose messages can go : the oldest task of each file (of all when ordered),
+                # the byte ranges of a file come back in file order
+                seen = set()
+                for slot in running:
+                    key = None if self.ordered else files[slot]
+                    if key not in seen:
+                        seen.add(key)
+                        yield slot
+
+            for slot in range(nslots):
+                submit(slot)
+            while running:
+                slot, soundings, stats = queue.get()
+                buffers[slot].append((soundings, stats))
+                done = True
+                while done:
+                    # a finished task may let the next one of its file go
+                    done = False
+                    for slot in heads():
+                        while buffers[slot]:
+                            soundings, stats = buffers[slot].popleft()
+                            credits[slot].release()
+                            yield from soundings
+                            if stats is None:
+                                continue
+                            if isinstance(stats, Exception):
+                                self.stats.errors += 1
+                                print(f"ERROR : {stats}", file=sys.stderr)
+                            else:
+                                self.stats = self.stats + stats
+                            running.remove(slot)
+                            submit(slot)
+                            done = True
+                            break
+                        if done:
+                            break
+        self.stats.elapsed = timedelta(seconds=perf_counter()-start)
@@ -1,25 +1,133 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import asyncio
+import os
 import sys
 
-from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
+from array import array
+from dataclasses import dataclass, fields
+from datetime import date, datetime, time, timedelta, timezone
 from io import TextIOWrapper
-from typing import Iterable, Generator, List, Optional, Callable
+from typing import AsyncGenerator, Iterable, Generator, List, Optional, Callable, Tuple, Dict
 from copy import copy
+from itertools import islice
+from time import perf_counter_ns, sleep
 
-from pigra.sounding import Sounding, Location
+from pigra.sounding import Sounding, LazySounding, Location
+from pigra.spatial import SpatialFilter
 from pigra.constants import P_SRC, NP_SRC, LevelType, QualityFlag
-from pigra.utils import stream_from
+from pigra.utils import BUFFER_SIZE, stream_from, mmap_from
+
+# decoding tables of parse_level/parse_header, flags are stored as indices into tuple(QualityFlag)
+_NAN = float("nan")
+_FLAG_CODES = {x: i for i, x in enumerate(QualityFlag)}
+_PASSED = _FLAG_CODES[QualityFlag.PASSED]
+_REMOVED, _MISSING = _FLAG_CODES[QualityFlag.REMOVED], _FLAG_CODES[QualityFlag.MISSING]
+_ERROR = _FLAG_CODES[QualityFlag.ERROR]
+_MISSING_VALUES = {QualityFlag.REMOVED.value: _REMOVED, QualityFlag.MISSING.value: _MISSING}
+_QC_FLAGS = {x.value: _FLAG_CODES[x] for x in (QualityFlag.UNCHECKED, QualityFlag.TIERS1, QualityFlag.PASSED)}
+_MAJORS = {str(x.value): x for x in LevelType.Major}
+_MINORS = {str(x.value): x for x in LevelType.Minor}
+_P_SOURCES = {x.value: x for x in P_SRC}
+_NP_SOURCES = {x.value: x for x in NP_SRC}
+_DIGITS = frozenset("0123456789")
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# interned header values shared by the soundings of a parse (a station file repeats
+# one station and a few locations), cleared when they grow beyond INTERN_SIZE
+INTERN_SIZE = 1 << 12
+_STATIONS: Dict[str, str] = {}
+_LOCATIONS: Dict[str, Location] = {}
+_RELTIMES: Dict[str, Optional[time]] = {}
+
+
+def _intern(table: dict, key: str, make: Callable):
+    if (value:=table.get(key, table)) is table:
+        if len(table) >= INTERN_SIZE:
+            table.clear()
+        value = table[key] = make(key)
+    return value
+
+
+def _location(value: str) -> Location:
+    # raw "lat     lon" header columns (1/10000 degree)
+    lat, lon = value[:7], value[8:]
+    return Location(float(f"{lat[:-4]}.{lat[-4:]}"), float(f"{lon[:-4]}.{lon[-4:]}"))
+
+
+def _epoch(year: int, month: int, day: int, hour=0) -> int:
+    # seconds since 1970 UTC, validated like datetime(year, month, day, hour)
+    if not 0 <= hour <= 23:
+        raise ValueError("hour must be in 0..23")
+    return (date(year, month, day).toordinal() - _EPOCH_ORDINAL)*86400 + hour*3600
+
+
+def _elapsed(value: str) -> float:
+    # seconds of a MMSS elapsed time, as datetime.strptime(value.strip(), "%M%S") reads it :
+    # minutes take two digits when the seconds can do with the rest ("  130" is 13:00,
+    # "730" is 7:30, "12" is 1:02), pigra.columnar.decode_levels applies the same rules
+    value = value.strip()
+    if _DIGITS.issuperset(value):
+        size = len(value)
+        if size == 2:
+            return int(value[0])*60 + int(value[1])
+        if size == 3:
+            if value[0] <= "5":
+                return int(value[:2])*60 + int(value[2])
+            if value[1] <= "5":
+                return int(value[0])*60 + int(value[1:])
+        elif size == 4 and value[0] <= "5" and value[2] <= "5":
+            return int(value[:2])*60 + int(value[2:])
+        raise ValueError(f"time data {value!r} does not match format '%M%S'")
+    dt = datetime.strptime(value, "%M%S")  # digits of other scripts
+    return dt.minute*60 + dt.second
+
+
+def _reltime(value: str) -> Optional[time]:
+    # release time HHMM, minute or whole time missing (99/9999), as strptime reads it
+    if value == "9999":
+        return None
+    if _DIGITS.issuperset(value):
+        if value[2:] == "99":
+            if value[:2] <= "23":
+                return time(int(value[:2]))
+        elif value[:2] <= "23" and value[2] <= "5":
+            return time(int(value[:2]), int(value[2:]))
+    if value[2:] == "99":
+        return datetime.strptime(value[:2], "%H").time()
+    return datetime.strptime(value, "%H%M").time()
 
 
 class SoundingException(Exception):
     pass
 
 
+def _parse_chunk(parser: "IgraParser", data: bytes) -> Tuple[List[Sounding], "IgraParser.Stats"]:
+    # complete records of aparse decoded by an executor, stats sent back with the soundings
+    return list(parser._parse_buffer(data)), parser.stats
+
+
 class IgraParser:
 
+    BATCH = 4096  # level lines decoded at once in columnar mode
+
+    @dataclass
+    class Profile:
+        # cumulated perf_counter_ns timings per phase
+        read_ns: int = 0  # input reading, decompression included
+        header_ns: int = 0
+        level_ns: int = 0
+        filter_ns: int = 0  # f_match calls
+        consumer_ns: int = 0  # time spent by the caller between two soundings
+        bytes: int = 0
+        levels: int = 0
+
+        def __add__(self, other):
+            if other.__class__ is not self.__class__:
+                return NotImplemented
+            return self.__class__(**{x.name: getattr(self, x.name)+getattr(other, x.name) for x in fields(self)})
+
     @dataclass
     class Stats:
         lines: int = 0
@@ -30,71 +138,510 @@ class IgraParser:
         errors: int = 0
         warnings: int = 0
         elapsed: timedelta = timedelta(seconds=0)
+        profile: Optional["IgraParser.Profile"] = None  # only when profiling
 
         def __eq__(self, other):
             if other.__class__ is not self.__class__:
                 return NotImplemented
-            # compare all attributes except elapsed
+            # compare all attributes except elapsed and timings
             s, o = copy(self.__dict__), copy(other.__dict__)
-            s['elapsed'] = o['elapsed'] = None
+            s['elapsed'] = o['elapsed'] = s['profile'] = o['profile'] = None
             return s == o
 
+        def __add__(self, other):
+            if other.__class__ is not self.__class__:
+                return NotImplemented
+            # merge stats of several parsers
+            merged = {k: v+other.__dict__[k] for k, v in self.__dict__.items() if k != 'profile'}
+            profiles = [x for x in (self.profile, other.profile) if x is not None]
+            merged['profile'] = profiles[0] + profiles[1] if len(profiles) == 2 else (profiles or [None])[0]
+            return self.__class__(**merged)
+
+        def rates(self) -> Dict[str, float]:
+            # throughput per second over elapsed time
+            seconds = self.elapsed.total_seconds() or float("inf")
+            rates = {"lines": self.lines / seconds, "soundings": self.processed / seconds}
+            if self.profile is not None:
+                rates["levels"] = self.profile.levels / seconds
+                rates["bytes"] = self.profile.bytes / seconds
+            return rates
+
     def __init__(self,
                  stream: Iterable = sys.stdin,
                  f_match: Callable[[Sounding], bool] = lambda x: True,
-                 verbose=False):
+                 verbose=False,
+                 columnar=False,
+                 skip_filtered=False,
+                 headers_only=False,
+                 lazy=False,
+                 profile=False,
+                 hook: Optional[Callable[["IgraParser.Stats"], None]] = None,
+                 hook_interval=1.0,
+                 bbox: Optional[Tuple[float, float, float, float]] = None,
+                 near: Optional[Tuple[float, float, float]] = None,
+                 epoch=False):
         self.stream = stream
         self.filename = None
         self.f_match = f_match
         self.verbose = verbose
+        self.columnar = columnar  # levels as a numpy structured array
+        self.skip_filtered = skip_filtered  # trust nlevels to skip unwanted level lines
+        self.headers_only = headers_only  # never build levels
+        self.lazy = lazy  # levels decoded on first access
+        self.profile = profile  # per phase timings in stats.profile
+        self.hook = hook  # called with stats every hook_interval seconds and at the end (implies profile)
+        self.hook_interval = hook_interval
+        self.epoch = epoch  # obstime kept as an int epoch, datetime built on access
+        # geobox (min_lon, min_lat, max_lon, max_lat) and/or radius (lat, lon, km) checked on raw headers
+        self.spatial = SpatialFilter(bbox, near) if bbox is not None or near is not None else None
+        # raw header checks run before parse_header (f_match.match_header of a pigra.filters.Filter)
+        prefilters = [x.match_header for x in (f_match, self.spatial) if hasattr(x, "match_header")]
+        self.match_header: Optional[Callable[[str], bool]] = \
+            prefilters[0] if len(prefilters) == 1 else (lambda x: all(f(x) for f in prefilters)) if prefilters else None
+        self.index = None
+        self.buffer = None  # raw bytes parsed instead of the stream
+        self.checkpoint = None  # incremental parsing resume point
+        self.follow, self.interval = False, 60.0  # incremental polling of the file
+        self.cache = None  # pigra.cache.ParseCache of parsed files
+        self.reader: Dict[str, object] = {}  # stream_from options of the file
         self.stats = IgraParser.Stats()
         
     @classmethod
     def from_file(cls,
                   filename: str,
                   f_match: Callable[[Sounding], bool] = lambda x: True,
-                  verbose=False):
-         parser = cls(stream_from(filename), f_match, verbose)              
+                  verbose=False,
+                  mmap=False,
+                  cache=None,
+                  threaded=True,
+                  buffering=BUFFER_SIZE,
+                  **options):
+         # mmap : uncompressed files are memory-mapped and parsed as raw bytes, filtered records
+         # are skipped undecoded, only columnar and lazy levels stay bytes (object levels are str)
+         # cache : True, a directory or a pigra.cache.ParseCache (default from the PIGRA_CACHE
+         # environment variable), parsed files are stored once and memory-mapped afterwards
+         # threaded, buffering : compressed files read ahead on a background thread, read size
+         # the cache holds decoded levels without timings : no lazy, profile or hook parsing, the
+         # PIGRA_CACHE default is then skipped
+         unsupported = [x for x in ("lazy", "profile", "hook") if options.get(x)]
+         if cache and unsupported:
+             raise ValueError(f"cache cannot be used with {', '.join(unsupported)}")
+         if cache is None and os.environ.get("PIGRA_CACHE") and not unsupported:
+             cache = True
+         if cache:
+             from pigra.cache import ParseCache
+             parser = cls(None, f_match, verbose, **options)
+             parser.cache = cache if isinstance(cache, ParseCache) else ParseCache(None if cache is True else cache)
+         elif mmap and (buffer:=mmap_from(filename)) is not None:
+             parser = cls.from_buffer(buffer, f_match, verbose, **options)
+         else:
+             parser = cls(stream_from(filename, threaded=threaded, buffering=buffering), f_match, verbose, **options)
          parser.filename = filename
+         parser.reader = {"threaded": threaded, "buffering": buffering}
          return parser
 
+    @classmethod
+    def from_buffer(cls,
+                    buffer,
+                    f_match: Callable[[Sounding], bool] = lambda x: True,
+                    verbose=False,
+                    **options):
+        # buffer : bytes-like object holding uncompressed IGRA data (bytes, mmap...)
+        parser = cls(None, f_match, verbose, **options)
+        parser.buffer = buffer
+        return parser
+
+    @classmethod
+    def from_index(cls,
+                   filename: str,
+                   f_match: Callable[[Sounding], bool] = lambda x: True,
+                   verbose=False,
+                   index_filename: Optional[str] = None,
+                   **options):
+        # f_match is first applied to headers from the sidecar index (levels not available yet)
+        # then only matching soundings are read from the data file
+        from pigra.index import IgraIndex
+        parser = cls(None, f_match, verbose, **options)
+        parser.filename = filename
+        parser.index = IgraIndex.open(filename, index_filename)
+        parser.reset()
+        return parser
+
+    @classmethod
+    def from_checkpoint(cls,
+                        filename: str,
+                        f_match: Callable[[Sounding], bool] = lambda x: True,
+                        verbose=False,
+                        checkpoint_filename: Optional[str] = None,
+                        follow=False,
+                        interval=60.0,
+                        **options):
+        # incremental parsing of a growing file : only soundings appended since the
+        # last run are parsed, a partially written last sounding is held back.
+        # The checkpoint is saved once all new soundings are consumed (at least once delivery).
+        # follow : polls the file every interval seconds for new soundings, never ends
+        from pigra.incremental import Checkpoint, CHECKPOINT_SUFFIX
+        if options.get("profile") or options.get("hook"):
+            raise ValueError("incremental parsing cannot be profiled")
+        parser = cls(None, f_match, verbose, **options)
+        parser.filename = filename
+        parser.checkpoint = Checkpoint.load(checkpoint_filename or filename + CHECKPOINT_SUFFIX)
+        parser.stats = parser.checkpoint.stats
+        parser.follow, parser.interval = follow, interval
+        return parser
+
+    @classmethod
+    def from_files(cls,
+                   filenames: Iterable[str],
+                   f_match: Callable[[Sounding], bool] = None,
+                   verbose=False,
+                   workers=None,
+                   ordered=False,
+                   **options):
+        # multiprocess parsing, f_match must be picklable
+        from pigra.parallel import ParallelIgraParser, match_all
+        return ParallelIgraParser(filenames, f_match or match_all, verbose, workers, ordered, **options)
+
+    @classmethod
+    def from_merge(cls,
+                   filenames: Iterable[str],
+                   f_match: Callable[[Sounding], bool] = lambda x: True,
+                   verbose=False,
+                   **options):
+        # soundings of several station files in global obstime order (k-way merge),
+        # all files are open at once, see pigra.merge.MergedIgraParser.windows for synoptic groups
+        # inputs are read without reader threads and with small buffers, many of them stay open
+        from pigra.merge import MergedIgraParser, BUFFER_SIZE as MERGE_BUFFER_SIZE
+        options.setdefault("threaded", False)
+        options.setdefault("buffering", MERGE_BUFFER_SIZE)
+        return MergedIgraParser(cls.from_file(x, f_match, verbose, **options) for x in filenames)
+
     def parse(self) -> Generator:
-        start = datetime.now()
+        if self.checkpoint is not None:
+            yield from self._parse_incremental()
+            return
+        if self.profile or self.hook:
+            yield from self._parse_profiled()
+            return
+        start = perf_counter_ns()
+        if self.cache is not None:
+            yield from self._parse_cached()
+        elif self.buffer is not None:
+            yield from self._parse_buffer(self.buffer)
+        else:
+            yield from self._parse_stream(self.stream)
+        self.stats.elapsed = timedelta(microseconds=(perf_counter_ns()-start)//1000)
+
+    def _parse_profiled(self) -> Generator:
+        # instrumented parsing : timed wrappers shadow the decoding functions
+        # on the instance, so the plain parse() path is left untouched
+        profile = self.stats.profile = IgraParser.Profile()
+
+        def timed(function, counter, count=None):
+            def wrapper(*args):
+                t = perf_counter_ns()
+                try:
+                    result = function(*args)
+                finally:
+                    setattr(profile, counter, getattr(profile, counter)+perf_counter_ns()-t)
+                if count:
+                    profile.levels += count(result)
+                return result
+            return wrapper
+
+        def read(stream):
+            stream = iter(stream)
+            while True:
+                t = perf_counter_ns()
+                line = next(stream, None)
+                profile.read_ns += perf_counter_ns()-t
+                if line is None:
+                    return
+                profile.bytes += len(line)
+                yield line
+
+        self.parse_header = timed(IgraParser.parse_header, "header_ns")
+        self.parse_level = timed(IgraParser.parse_level, "level_ns", lambda x: 1)
+        self._decode = timed(IgraParser._decode, "level_ns", lambda x: len(x[0]))
+        f_match, self.f_match = self.f_match, timed(self.f_match, "filter_ns")
+        start = last = perf_counter_ns()
+        try:
+            if self.buffer is not None:
+                profile.bytes = len(self.buffer)
+                soundings = self._parse_buffer(self.buffer)
+            else:
+                soundings = self._parse_stream(read(self.stream))
+            for sounding in soundings:
+                t = perf_counter_ns()
+                yield sounding
+                now = perf_counter_ns()
+                profile.consumer_ns += now-t
+                if self.hook and now-last >= self.hook_interval*1e9:
+                    last = now
+                    self.stats.elapsed = timedelta(microseconds=(now-start)//1000)
+                    self.hook(self.stats)
+        finally:
+            self.f_match = f_match
+            del self.parse_header, self.parse_level, self._decode
+        self.stats.elapsed = timedelta(microseconds=(perf_counter_ns()-start)//1000)
+        if self.hook:
+            self.hook(self.stats)
+
+    def _parse_stream(self, stream: Iterable) -> Generator:
         sounding: Optional[Sounding] = None
-        for line in self.stream:
+        block: List[str] = []  # level lines waiting for a columnar decoding
+        pending: List[Tuple[Sounding, int]] = []  # soundings waiting for their levels
+        lines = iter(stream)
+        for line in lines:
             self.stats.lines += 1
             if not line:
                 self.stats.null += 1
                 continue
             if line[0] == '#':
                 if sounding:
+                    yield from self._complete(sounding, block, pending)
+                sounding, matched, nlevels = self._header(line)
+                if matched:
+                    if not self.headers_only:
+                        continue
                     yield sounding
-                try:
-                    sounding = self.parse_header(line)
-                    self.stats.records += 1
-                except Exception as e:
-                    self.stats.errors += 1
-                    if self.verbose:
-                        print(f"ERROR : {e}\n{line=}", file=sys.stderr)
-                    continue
-                if self.f_match(sounding):
-                    self.stats.processed += 1
-                else:
-                    self.stats.filtered += 1
-                    sounding = None
+                sounding = None
+                if self.skip_filtered and nlevels:
+                    # consume the level block at once, a wrong nlevels would swallow next header
+                    self.stats.lines += sum(1 for _ in islice(lines, nlevels))
             elif sounding:
-                try:
-                    level = self.parse_level(line)
-                except Exception as e:
-                    self.stats.warnings += 1
-                    if self.verbose:
-                        print(
-                            f"WARNING : {e}\n{sounding.header()=}\n{line=}", file=sys.stderr)
-                    continue
-                sounding.add(level)
-        if sounding:
+                if self.lazy:
+                    sounding.raw.append(line)
+                elif self.columnar:
+                    block.append(line)
+                else:
+                    self._level(sounding, line)
+        yield from self._complete(sounding, block, pending, flush=True)
+
+    def _parse_cached(self) -> Generator:
+        # soundings rebuilt from the parse cache, the file is parsed and stored on a miss
+        cached = self.cache.load(self.filename) or self.cache.build(self.filename)
+        if cached is None:
+            yield from self._parse_stream(stream_from(self.filename))
+            return
+        stats = self.stats
+        stats.lines, stats.null, stats.errors = stats.lines + cached.lines, stats.null + cached.null, stats.errors + cached.errors
+        for sounding, start, count, warnings in cached.records(self.epoch):
+            stats.records += 1
+            if (self.spatial and not self.spatial(sounding)) or not self.f_match(sounding):
+                stats.filtered += 1
+                continue
+            stats.processed += 1
+            if not self.headers_only:
+                stats.warnings += warnings
+                sounding.levels = cached.levels_of(start, count, self.columnar)
             yield sounding
-        self.stats.elapsed = datetime.now()-start
+
+    def _parse_incremental(self) -> Generator:
+        # soundings after the checkpoint offset, checkpoint saved once they are all consumed
+        from pigra.incremental import complete_length
+        checkpoint = self.checkpoint
+        while True:
+            start = perf_counter_ns()
+            with stream_from(self.filename, binary=True) as f:
+                size = f.seek(0, 2)
+                if size < checkpoint.offset:
+                    # truncated or replaced file, starting over
+                    checkpoint.offset, self.stats = 0, IgraParser.Stats()
+                f.seek(checkpoint.offset)
+                data = f.read()
+            length = complete_length(data)
+            if length:
+                yield from self._parse_buffer(data[:length] if length < len(data) else data)
+                checkpoint.offset += length
+            self.stats.elapsed += timedelta(microseconds=(perf_counter_ns()-start)//1000)
+            checkpoint.stats = self.stats
+            checkpoint.save()
+            if not self.follow:
+                return
+            sleep(self.interval)
+
+    async def aparse(self, source, executor=None, chunk_size=1 << 16) -> AsyncGenerator:
+        """ Parses an asyncio.StreamReader or an async iterable of bytes (or str) chunks
+
+        Input is read by chunk_size bytes only when the consumer asks for more
+        soundings (backpressure), complete records are parsed as raw bytes
+        like from_buffer does. With an executor (concurrent.futures.Executor)
+        decoding runs off the event loop, otherwise each chunk is parsed
+        inline and the loop gets control back between chunks. A process pool
+        executor needs a picklable parser (f_match a module-level function),
+        the stats of its workers are merged here. Not for profile or hook parsing.
+        """
+        if self.profile or self.hook:
+            raise ValueError("asynchronous parsing cannot be profiled")
+        loop = asyncio.get_running_loop()
+        start = perf_counter_ns()
+        pending = b""
+        async for chunk in self._chunks(source, chunk_size):
+            pending += chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+            cut = pending.rfind(b"\n#") + 1  # records before the last header are complete
+            if cut <= 0:
+                continue
+            data, pending = pending[:cut], pending[cut:]
+            if executor is not None:
+                soundings, stats = await loop.run_in_executor(executor, _parse_chunk, self._worker(), data)
+                self.stats = self.stats + stats
+                if self.lazy and not self.headers_only:
+                    for sounding in soundings:  # levels decoded here, warnings counted here
+                        sounding.stats = self.stats
+            else:
+                soundings = self._parse_buffer(data)
+            for sounding in soundings:
+                yield sounding
+            await asyncio.sleep(0)
+        if pending:
+            for sounding in self._parse_buffer(pending):
+                yield sounding
+        self.stats.elapsed = timedelta(microseconds=(perf_counter_ns()-start)//1000)
+
+    def _worker(self) -> "IgraParser":
+        # copy parsing chunks for an executor, without input nor stats
+        worker = copy(self)
+        worker.stream = worker.buffer = worker.index = worker.checkpoint = worker.cache = None
+        worker.stats = IgraParser.Stats()
+        return worker
+
+    @staticmethod
+    async def _chunks(source, chunk_size: int) -> AsyncGenerator:
+        if hasattr(source, "read"):
+            while chunk := await source.read(chunk_size):
+                yield chunk
+        else:
+            async for chunk in source:
+                yield chunk
+
+    def _parse_buffer(self, buffer) -> Generator:
+        # records are located with memchr-like searches on raw bytes,
+        # filtered records are skipped without splitting them into lines.
+        # Not zero-copy : columnar level lines are bytes slices, object mode
+        # levels are decoded to str like the stream ones
+        block: List[bytes] = []
+        pending: List[Tuple[Sounding, int]] = []
+        position, size = 0, len(buffer)
+        while position < size:
+            end = buffer.find(b"\n#", position) + 1 or size  # next header
+            if buffer[position:position+1] != b"#":
+                # lines outside any record
+                self.stats.lines += self._count_lines(buffer, position, end)
+                position = end
+                continue
+            eol = buffer.find(b"\n", position, end)
+            eol = end if eol < 0 else eol
+            sounding, matched, _ = self._header(
+                buffer[position:eol].decode("utf-8", "replace"))
+            if not matched or self.headers_only:
+                self.stats.lines += self._count_lines(buffer, position, end)
+                position = end
+                if matched:
+                    yield sounding
+                continue
+            if self.lazy:
+                # raw level block kept as is
+                sounding.raw = buffer[eol+1:end]
+                self.stats.lines += self._count_lines(buffer, position, end)
+                position = end
+                yield sounding
+                continue
+            if self.columnar:
+                lines = buffer[eol+1:end].splitlines()
+                self.stats.lines += 1 + len(lines)
+                block.extend(lines)
+                yield from self._complete(sounding, block, pending)
+            else:
+                # the level block decoded at once, then split like bytes.splitlines does
+                lines = str(buffer[eol+1:end], "utf-8", "replace").replace("\r\n", "\n").split("\n")
+                if not lines[-1]:
+                    lines.pop()
+                self.stats.lines += 1 + len(lines)
+                for line in lines:
+                    self._level(sounding, line)
+                yield sounding
+            position = end
+        yield from self._complete(None, block, pending, flush=True)
+
+    @staticmethod
+    def _count_lines(buffer, start: int, end: int) -> int:
+        if end <= start:
+            return 0
+        return buffer[start:end].count(b"\n") + (buffer[end-1:end] != b"\n")
+
+    def _header(self, line: str) -> Tuple[Optional[Sounding], bool, int]:
+        # returns the parsed sounding (None on error or rejected raw header), whether it matches
+        # and its number of levels (0 on error, read from the raw header when rejected there)
+        # records selected through a sidecar index have already been matched by IgraIndex.select
+        if self.match_header and self.index is None and not self.match_header(line):
+            self.stats.records += 1
+            self.stats.filtered += 1
+            nlevels = line[32:36].strip()
+            return None, False, int(nlevels) if nlevels.isdigit() else 0
+        try:
+            sounding = self.parse_header(line, self.epoch)
+            self.stats.records += 1
+        except Exception as e:
+            self.stats.errors += 1
+            if self.verbose:
+                print(f"ERROR : {e}\n{line=}", file=sys.stderr)
+            return None, False, 0
+        if self.index is not None or self.f_match(sounding):
+            self.stats.processed += 1
+            if self.lazy and not self.headers_only:
+                sounding = LazySounding(sounding, self.columnar, self.stats)
+            return sounding, True, sounding.nlevels
+        self.stats.filtered += 1
+        return sounding, False, sounding.nlevels
+
+    def _level(self, sounding: Sounding, line: str):
+        try:
+            level = self.parse_level(line)
+        except Exception as e:
+            self.stats.warnings += 1
+            if self.verbose:
+                print(
+                    f"WARNING : {e}\n{sounding.header()=}\n{line=}", file=sys.stderr)
+            return
+        sounding.add(level)
+
+    def _complete(self, sounding: Optional[Sounding], block: List[str], pending: List[Tuple[Sounding, int]], flush=False):
+        if self.lazy or not self.columnar:
+            if sounding:
+                yield sounding
+            return
+        # columnar levels are decoded by batches of lines spanning several soundings
+        if sounding:
+            pending.append((sounding, len(block)))
+        if not pending or (len(block) < IgraParser.BATCH and not flush):
+            return
+        levels, valid = self._decode(block)
+        for sounding, sounding.levels, bad in self._split(levels, valid, pending):
+            if bad > 0:
+                self.stats.warnings += bad
+                if self.verbose:
+                    print(
+                        f"WARNING : {bad} bad level(s)\n{sounding.header()=}", file=sys.stderr)
+        soundings = [x for x, _ in pending]
+        block.clear()
+        pending.clear()
+        yield from soundings
+
+    @staticmethod
+    def _split(levels, valid, pending: List[Tuple[Sounding, int]]) -> Generator:
+        # (sounding, levels view, bad level lines) of soundings whose lines end at pending offsets of a decoded block
+        valid = valid.cumsum()
+        first, start = 0, 0
+        for sounding, end in pending:
+            stop = int(valid[end-1]) if end else 0
+            yield sounding, levels[start:stop][:sounding.nlevels], (end-first)-(stop-start)
+            first, start = end, stop
+
+    @staticmethod
+    def _decode(block: List[str]):
+        from pigra.columnar import decode_levels
+        return decode_levels(block)
 
     def analyze(self):
         stations = set()
@@ -114,12 +661,23 @@ class IgraParser:
             print(sounding.header())
 
     def reset(self):
-        if self.filename:
-            self.stream = stream_from(self.filename)
+        if self.index:
+            self.stats = IgraParser.Stats()
+            entries = self.index.select(self.f_match, self.stats, self.match_header)
+            if self.headers_only and not self.skip_filtered:
+                # data file not even opened
+                self.stream = (x.header for x in entries)
+            else:
+                self.stream = self.index.lines(entries)
+        elif self.filename:
+            if self.buffer is None and self.cache is None:
+                self.stream = stream_from(self.filename, **self.reader)
             self.stats = IgraParser.Stats() 
 
     @staticmethod
-    def parse_header(hdr: str) -> Sounding:
+    def parse_header(hdr: str, epoch=False) -> Sounding:
+        # epoch : obstime kept as seconds since 1970 UTC, datetime built on access
+        # station, reltime and location objects are shared with previous soundings
         if not hdr:
             raise SoundingException("Bad header string")
         if hdr[0] != '#':
@@ -127,30 +685,23 @@ class IgraParser:
         hdr = hdr.strip()
         if len(hdr) != 71:
             raise SoundingException("Bad header length")
-        station = hdr[1:12]
+        station = _intern(_STATIONS, hdr[1:12], str)
         if hdr[24:26] == "99":  # missing hour
             fields = [int(x) for x in hdr[13:23].split()]
         else:
             fields = [int(x) for x in hdr[13:26].split()]
-        obstime = datetime(*fields, tzinfo=timezone.utc)
-        reltime = hdr[27:31]
-        if reltime == "9999":  # missing release time
-            reltime = None
-        elif reltime[-2:] == "99":  # missing release time minute
-            reltime = reltime[:2]
-            reltime = datetime.strptime(reltime, "%H").time()
-        else:
-            reltime = datetime.strptime(reltime, "%H%M").time()
+        obstime = _epoch(*fields) if epoch else datetime(*fields, tzinfo=timezone.utc)
+        reltime = _intern(_RELTIMES, hdr[27:31], _reltime)
         nlevels = int(hdr[32:36])
         datasource_p, datasource_np = None, None
+        # unknown codes raise ValueError, as P_SRC(datasource) and NP_SRC(datasource) do
         if (datasource:=hdr[37:45].strip()) != "":
-            datasource_p = P_SRC(datasource)
+            if (datasource_p:=_P_SOURCES.get(datasource)) is None:
+                raise ValueError(f"{datasource!r} is not a valid P_SRC")
         if (datasource:=hdr[46:54].strip()) != "":
-            datasource_np = NP_SRC(datasource)
-        lat, lon = hdr[55:62], hdr[63:71]
-        lat, lon = f"{lat[:-4]}.{lat[-4:]}", f"{lon[:-4]}.{lon[-4:]}"
-        lat, lon = float(lat), float(lon)
-        location = Location(lat, lon)
+            if (datasource_np:=_NP_SOURCES.get(datasource)) is None:
+                raise ValueError(f"{datasource!r} is not a valid NP_SRC")
+        location = _intern(_LOCATIONS, hdr[55:71], _location)
         return Sounding(station, obstime, reltime, nlevels, datasource_p, datasource_np, location)
 
     @staticmethod
@@ -160,65 +711,36 @@ class IgraParser:
         line = line.strip()
         if len(line) != 51:
             raise SoundingException("Bad level length")
-        # major level type indicator
-        major = LevelType.Major(int(line[0]))
-        # minor level type indicator
-        minor = LevelType.Minor(int(line[1]))
+        # fixed-width fields decoded straight into the packed Sounding.Level layout
+        level = Sounding.Level.__new__(Sounding.Level)
+        # major and minor level type indicators, unknown ones raise ValueError like the Enum calls
+        try:
+            level.major, level.minor = _MAJORS[line[0]], _MINORS[line[1]]
+        except KeyError as e:
+            raise ValueError(f"{e.args[0]!r} is not a valid level type") from None
         # elapsed time
-        if (value:=line[3:8]) in ("-8888", "-9999"):
-            elapsed = None, QualityFlag(value)
-        else:
-            dt = datetime.strptime(value.strip(), "%M%S")
-            elapsed = timedelta(minutes=dt.minute,
-                                seconds=dt.second), QualityFlag.PASSED
-        # pressure
-        if (value:=line[9:15]) == "-9999":
-            value = None
-        else:
-            value = int(value)
-        if (flag:=line[15]) in (' ', 'A', 'B'):
-            flag = QualityFlag(flag)
+        if (flag:=_MISSING_VALUES.get(value:=line[3:8])) is None:
+            elapsed, flag = _elapsed(value), _PASSED
         else:
-            flag = QualityFlag.ERROR
-        pressure = value, flag
-        # height
-        if (value:=line[16:21]) in ("-8888", "-9999"):
-            value = None
-        else:
-            value = int(value)
-        if (flag:=line[21]) in (' ', 'A', 'B'):
-            flag = QualityFlag(flag)
-        else:
-            flag = QualityFlag.ERROR
-        height = value, flag
-        # temperature
-        if (value:=line[22:27]) in ("-8888", "-9999"):
-            value = None
-        else:
-            value = int(value)/10
-        if (flag:=line[27]) in (' ', 'A', 'B'):
-            flag = QualityFlag(flag)
-        else:
-            flag = QualityFlag.ERROR
-        temperature = value, flag
-        # humidity
-        if (value:=line[28:33]) in ("-8888", "-9999"):
-            humidity = None, QualityFlag(value)
-        else:
-            humidity = int(value)/10, QualityFlag.PASSED
-        # dew point
-        if (value:=line[34:39]) in ("-8888", "-9999"):
-            dewpoint = None, QualityFlag(value)
-        else:
-            dewpoint = int(value)/10, QualityFlag.PASSED
-        # wind direction
-        if (value:=line[40:45]) in ("-8888", "-9999"):
-            winddir = None, QualityFlag(value)
-        else:
-            winddir = int(value), QualityFlag.PASSED
-        # wind speed
-        if (value:=line[46:51]) in ("-8888", "-9999"):
-            windspeed = None, QualityFlag(value)
-        else:
-            windspeed = int(value)/10, QualityFlag.PASSED
-        return Sounding.Level(major, minor, elapsed, pressure, height, temperature, humidity, dewpoint, winddir, windspeed)
+            elapsed = _NAN
+        # pressure (6 characters, never "-9999"), height and temperature with their quality flags
+        values = [elapsed, int(line[9:15]),
+                  _NAN if (value:=line[16:21]) in _MISSING_VALUES else int(value),
+                  _NAN if (value:=line[22:27]) in _MISSING_VALUES else int(value)/10]
+        flags = [flag, _QC_FLAGS.get(line[15], _ERROR), _QC_FLAGS.get(line[21], _ERROR), _QC_FLAGS.get(line[27], _ERROR)]
+        # humidity, dew point, wind direction and speed, flagged when missing
+        for value, scale in ((line[28:33], 10), (line[34:39], 10), (line[40:45], 1), (line[46:51], 10)):
+            if (flag:=_MISSING_VALUES.get(value)) is None:
+                values.append(int(value)/scale)
+                flags.append(_PASSED)
+            else:
+                values.append(_NAN)
+                flags.append(flag)
+        level._values, level._flags = array("d", values), bytes(flags)
+        return level
+
+    @staticmethod
+    def parse_levels_array(lines: List[str]):
+        # numpy is optional, only required by the columnar mode
+        from pigra.columnar import parse_levels
+        return parse_levels(lines)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import sys
+
+from datetime import timedelta
+from time import perf_counter
+from typing import Callable, Optional
+
+from pigra.parser import IgraParser
+
+
+class Progress:
+    """ Parser hook reporting progress and throughput on stderr
+
+    position() returns the bytes consumed in the input (compressed position
+    for gz/zip files) and size is the input size, both optional. Several
+    inputs can be followed in turn with next(), counters add up.
+    """
+
+    def __init__(self, size: Optional[int] = None, out=sys.stderr, machine=False):
+        self.size = size
+        self.out = out
+        self.machine = machine  # one json record per report instead of a status line
+        self.position: Callable[[], Optional[int]] = lambda: None
+        self.offset = 0  # bytes of completed inputs
+        self.done = IgraParser.Stats()  # stats of completed inputs
+        self.start = perf_counter()
+
+    def next(self, position: Callable[[], Optional[int]], stats: Optional[IgraParser.Stats] = None, size=0):
+        # previous input completed with stats and size, now following position of next one
+        if stats is not None:
+            self.done = self.done + IgraParser.Stats(**{**stats.__dict__, "profile": None})
+            self.offset += size
+        self.position = position
+
+    def __call__(self, stats: IgraParser.Stats):
+        elapsed = perf_counter() - self.start
+        lines, soundings = self.done.lines + stats.lines, self.done.processed + stats.processed
+        position = self.position()
+        consumed = None if position is None else self.offset + position
+        eta = None
+        if consumed and self.size:
+            eta = timedelta(seconds=round(elapsed * (self.size - consumed) / consumed))
+        report = {
+            "elapsed": round(elapsed, 3),
+            "bytes": consumed,
+            "size": self.size,
+            "lines": lines,
+            "soundings": soundings,
+            "lines_per_sec": round(lines / elapsed, 1) if elapsed else None,
+            "soundings_per_sec": round(soundings / elapsed, 1) if elapsed else None,
+            "eta": None if eta is None else eta.total_seconds()
+        }
+        if self.machine:
+            print(json.dumps(report), file=self.out, flush=True)
+            return
+        done = ""
+        if consumed is not None:
+            done = f"{consumed:,} bytes" + (f" / {self.size:,} ({100*consumed/self.size:.1f}%)" if self.size else "")
+        print(f"{done}  {report['lines_per_sec'] or 0:,.0f} lines/s  {report['soundings_per_sec'] or 0:,.0f} soundings/s"
+              f"{'' if eta is None else f'  ETA {eta}'}", file=self.out, flush=True)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Quality control checks run on batches of soundings as numpy arrays (requires numpy)
+# pip install numpy
+#
+# Checks run on the concatenated levels of a batch (see derived.batch), never
+# level by level : pressure must decrease upwards and the temperature lapse
+# rate between reported levels must stay within gross-error limits. Counts of
+# REMOVED/MISSING/ERROR flags per field are aggregated per station as the
+# soundings stream by.
+
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, Generator, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pigra.columnar import FIELDS, FLAG_CODES
+from pigra.derived import EXCLUDED, batch, valid
+from pigra.parser import IgraParser
+from pigra.sounding import Sounding
+
+CHECKS = ("pressure_order", "lapse_rate")
+LAPSE_RATE = (-100.0, 30.0)  # K/km, strong inversion to strongly superadiabatic
+MIN_DEPTH = 10.0  # gpm, thinner layers are not checked for lapse rate
+
+
+@dataclass(eq=False)
+class Summary:
+    """ QC aggregates of a station, flags[i, j] counts FIELDS[i] values flagged EXCLUDED[j] """
+    soundings: int = 0
+    levels: int = 0
+    flags: np.ndarray = field(default_factory=lambda: np.zeros((len(FIELDS), len(EXCLUDED)), dtype=np.int64))
+    pressure_order: int = 0  # levels with a pressure not below the previous one
+    lapse_rate: int = 0  # levels with a lapse rate from the previous one out of limits
+
+    def __add__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.__class__(**{x: getattr(self, x)+getattr(other, x) for x in self.__dataclass_fields__})
+
+    def to_dict(self) -> dict:
+        return {"soundings": self.soundings, "levels": self.levels,
+                "flags": {name: {flag.name.lower(): int(count) for flag, count in zip(EXCLUDED, counts) if count}
+                          for name, counts in zip(FIELDS, self.flags) if counts.any()},
+                "pressure_order": self.pressure_order, "lapse_rate": self.lapse_rate}
+
+
+@dataclass
+class Result:
+    """ QC of one batch : levels failing any check per sounding, per check level masks on request """
+    offsets: np.ndarray
+    failed: np.ndarray
+    masks: Optional[Dict[str, np.ndarray]] = None
+
+
+def _previous(mask: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    # index of the previous level of the same sounding where mask holds, -1 if none
+    index = np.where(mask, np.arange(len(mask)), -1)
+    previous = np.empty_like(index)
+    previous[:1] = -1
+    np.maximum.accumulate(index[:-1], out=previous[1:])
+    previous[previous < starts] = -1
+    return previous
+
+
+def checks(levels: np.ndarray,
+           offsets: np.ndarray,
+           lapse_rate: Tuple[float, float] = LAPSE_RATE,
+           min_depth=MIN_DEPTH) -> Dict[str, np.ndarray]:
+    """ Level masks of each check in CHECKS, True where the level fails it """
+    starts = np.repeat(offsets[:-1], np.diff(offsets))
+    pressure = levels["pressure"]
+    known = valid(levels, "pressure")
+    previous = _previous(known, starts)
+    pressure_order = known & (previous >= 0)
+    pressure_order[pressure_order] = pressure[pressure_order] >= pressure[previous[pressure_order]]
+    # lapse rate between consecutive levels reporting both temperature and height
+    known = valid(levels, "temperature") & valid(levels, "height")
+    previous = _previous(known, starts)
+    current = np.flatnonzero(known & (previous >= 0))
+    depth = levels["height"][current] - levels["height"][previous[current]]
+    # temperatures are tenths of degrees, rounding keeps columnar and object levels alike at the limits
+    cooling = np.round(levels["temperature"][previous[current]] - levels["temperature"][current], 1)
+    rate = 1000 * cooling / np.where(depth > 0, depth, np.nan)
+    out = (depth >= min_depth) & ((rate < lapse_rate[0]) | (rate > lapse_rate[1]))
+    lapse = np.zeros(len(levels), dtype=bool)
+    lapse[current[out]] = True
+    return {"pressure_order": pressure_order, "lapse_rate": lapse}
+
+
+class QualityControl:
+    """ Batched QC of streamed soundings with per-station Summary aggregates
+
+    stream() passes soundings through unchanged, checking them by chunks.
+    Levels failing a check add to stats.warnings and soundings with pressures
+    out of order to stats.errors, when stats (usually parser.stats) is given.
+    With masks=True, results keep the level masks of every check.
+    """
+
+    def __init__(self,
+                 lapse_rate: Tuple[float, float] = LAPSE_RATE,
+                 min_depth=MIN_DEPTH,
+                 masks=False,
+                 stats: Optional[IgraParser.Stats] = None):
+        self.lapse_rate = lapse_rate
+        self.min_depth = min_depth
+        self.masks = masks
+        self.stats = stats
+        self.stations: Dict[str, Summary] = {}
+
+    @property
+    def summary(self) -> Summary:
+        return sum(self.stations.values(), Summary())
+
+    def check(self, soundings: Sequence[Sounding]) -> Result:
+        levels, offsets = batch(soundings)
+        masks = checks(levels, offsets, self.lapse_rate, self.min_depth)
+        failed = np.logical_or.reduce(list(masks.values()))
+        counts = np.diff(offsets)
+        names, station = np.unique([x.station for x in soundings], return_inverse=True)
+        nstations, nfields = len(names), len(FIELDS)
+        # per station aggregates, one bincount per quantity
+        station_levels = np.repeat(station, counts)
+        flags = np.stack([levels[f"{x}_flag"] for x in FIELDS], axis=1)
+        cells = station_levels[:, None]*nfields + np.arange(nfields)
+        flag_counts = np.stack([np.bincount(cells[flags == FLAG_CODES[x]], minlength=nstations*nfields)
+                                for x in EXCLUDED], axis=1).reshape(nstations, nfields, len(EXCLUDED))
+        totals = {"soundings": np.bincount(station, minlength=nstations),
+                  "levels": np.bincount(station_levels, minlength=nstations),
+                  **{x: np.bincount(station_levels[masks[x]], minlength=nstations) for x in CHECKS}}
+        for i, name in enumerate(names.tolist()):
+            summary = self.stations.setdefault(name, Summary())
+            summary.flags += flag_counts[i]
+            for key, values in totals.items():
+                setattr(summary, key, getattr(summary, key) + int(values[i]))
+        sounding_ids = np.repeat(np.arange(len(soundings)), counts)
+        if self.stats is not None:
+            self.stats.warnings += int(failed.sum())
+            self.stats.errors += len(np.unique(sounding_ids[masks["pressure_order"]]))
+        return Result(offsets, np.bincount(sounding_ids[failed], minlength=len(soundings)),
+                      masks if self.masks else None)
+
+    def stream(self, soundings: Iterable[Sounding], chunk=1024) -> Generator:
+        """ Soundings unchanged, checked by chunks """
+        soundings = iter(soundings)
+        while block:=list(islice(soundings, chunk)):
+            self.check(block)
+            yield from block
+
+    def results(self, soundings: Iterable[Sounding], chunk=1024) -> Generator[Tuple[list, Result], None, None]:
+        """ Soundings by chunks along with their QC Result """
+        soundings = iter(soundings)
+        while block:=list(islice(soundings, chunk)):
+            yield block, self.check(block)
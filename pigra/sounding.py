@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from dataclasses import dataclass
-from datetime import datetime, timedelta, time
-from typing import List, Optional, Tuple
+import json
+
+from array import array
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta, time, timezone
+from functools import cached_property
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 from pigra.constants import P_SRC, NP_SRC, LevelType, QualityFlag
 
+_NAN = float("nan")
+_FLAGS = tuple(QualityFlag)
+_FLAG_CODES = {x: i for i, x in enumerate(_FLAGS)}
 
-@dataclass
+
+@dataclass(frozen=True)
 class Location:
+    # immutable, parsed headers share their Location instances
     lat: float = 0.0
     lon: float = 0.0
     
@@ -24,18 +33,76 @@ class Location:
 @dataclass
 class Sounding:
 
-    @dataclass
     class Level:
+        """ Sounding level, values packed into a typed array and flags into bytes
+
+        Fields read as (value, QualityFlag) tuples : level.temperature[0]
+        """
+        __slots__ = ("major", "minor", "_values", "_flags")
+
+        FIELDS = ("elapsed", "pressure", "height", "temperature",
+                  "humidity", "dewpoint", "winddir", "windspeed")
+
         major: LevelType.Major
         minor: LevelType.Minor
-        elapsed: Tuple[Optional[timedelta], QualityFlag]
-        pressure: Tuple[Optional[int], QualityFlag]
-        height: Tuple[Optional[int], QualityFlag]
-        temperature: Tuple[Optional[float], QualityFlag]
-        humidity: Tuple[Optional[float], QualityFlag]
-        dewpoint: Tuple[Optional[float], QualityFlag]
-        winddir: Tuple[Optional[int], QualityFlag]
-        windspeed: Tuple[Optional[float], QualityFlag]
+
+        def __init__(self,
+                     major: LevelType.Major,
+                     minor: LevelType.Minor,
+                     elapsed: Tuple[Optional[timedelta], QualityFlag],
+                     pressure: Tuple[Optional[int], QualityFlag],
+                     height: Tuple[Optional[int], QualityFlag],
+                     temperature: Tuple[Optional[float], QualityFlag],
+                     humidity: Tuple[Optional[float], QualityFlag],
+                     dewpoint: Tuple[Optional[float], QualityFlag],
+                     winddir: Tuple[Optional[int], QualityFlag],
+                     windspeed: Tuple[Optional[float], QualityFlag]):
+            self.major = major
+            self.minor = minor
+            fields = (elapsed, pressure, height, temperature,
+                      humidity, dewpoint, winddir, windspeed)
+            self._values = array("d", (_NAN if x is None else x for x, _ in fields[1:]))
+            self._values.insert(0, _NAN if elapsed[0] is None else elapsed[0].total_seconds())
+            self._flags = bytes(_FLAG_CODES[x] for _, x in fields)
+
+        @classmethod
+        def packed(cls, major: LevelType.Major, minor: LevelType.Minor, values: bytes, flags: bytes):
+            # level from its packed float64 values and flag codes, in FIELDS order
+            level = cls.__new__(cls)
+            level.major, level.minor = major, minor
+            level._values = array("d")
+            level._values.frombytes(values)
+            level._flags = bytes(flags)
+            return level
+
+        def _field(self, index: int, kind: type):
+            value, flag = self._values[index], _FLAGS[self._flags[index]]
+            if value != value:  # NaN
+                return None, flag
+            if kind is timedelta:
+                return timedelta(seconds=value), flag
+            return kind(value), flag
+
+        elapsed = property(lambda self: self._field(0, timedelta))
+        pressure = property(lambda self: self._field(1, int))
+        height = property(lambda self: self._field(2, int))
+        temperature = property(lambda self: self._field(3, float))
+        humidity = property(lambda self: self._field(4, float))
+        dewpoint = property(lambda self: self._field(5, float))
+        winddir = property(lambda self: self._field(6, int))
+        windspeed = property(lambda self: self._field(7, float))
+
+        def to_dict(self) -> dict:
+            return {"major": self.major, "minor": self.minor,
+                    **{x: getattr(self, x) for x in self.FIELDS}}
+
+        def __eq__(self, other):
+            if other.__class__ is not self.__class__:
+                return NotImplemented
+            return self.to_dict() == other.to_dict()
+
+        def __repr__(self):
+            return f"Sounding.Level({', '.join(f'{k}={v!r}' for k, v in self.to_dict().items())})"
 
     station: str
     obstime: datetime
@@ -48,7 +115,7 @@ class Sounding:
 
     def __init__(self,
                  station: str,
-                 obstime: datetime,
+                 obstime: Union[datetime, int],
                  reltime: Optional[time],
                  nlevels: int,
                  datasource_p: Optional[P_SRC],
@@ -56,7 +123,10 @@ class Sounding:
                  location: Location,
                  origin: str = None):
         self.station = station
-        self.obstime = obstime
+        if isinstance(obstime, int):
+            self._epoch = obstime  # seconds since 1970 UTC, obstime built on access
+        else:
+            self.obstime = obstime
         self.reltime = reltime
         self.nlevels = nlevels
         self.datasource_p = datasource_p
@@ -64,6 +134,19 @@ class Sounding:
         self.location = location
         self.levels = []
 
+    def __getattr__(self, name: str):
+        # only called when obstime is kept as an epoch (see IgraParser epoch option)
+        if name == "obstime" and "_epoch" in self.__dict__:
+            return datetime.fromtimestamp(self._epoch, timezone.utc)
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
+    @property
+    def epoch(self) -> int:
+        # obstime in seconds since 1970-01-01 UTC
+        if "obstime" in self.__dict__:
+            return int(self.obstime.timestamp())
+        return self._epoch
+
     @property
     def __geo_interface__(self):
         return self.location.__geo_interface__
@@ -72,20 +155,153 @@ class Sounding:
         if len(self.levels) < self.nlevels:
             self.levels.append(level)
 
+    def select(self,
+               minor: Optional[LevelType.Minor] = None,
+               pressure: Optional[Tuple[int, int]] = None):
+        # levels of the given minor type and/or within a pressure range (Pa)
+        levels = self.levels
+        if not isinstance(levels, list):
+            # columnar levels
+            mask = levels["minor"] >= 0
+            if minor is not None:
+                mask &= levels["minor"] == minor.value
+            if pressure is not None:
+                mask &= (levels["pressure"] >= pressure[0]) & (levels["pressure"] <= pressure[1])
+            return levels[mask]
+        return [x for x in levels
+                if (minor is None or x.minor == minor) and
+                (pressure is None or (x.pressure[0] is not None and pressure[0] <= x.pressure[0] <= pressure[1]))]
+
     def header(self) -> str:
         return f"{self.station}\t{self.obstime.isoformat()}\t{self.nlevels:>4} levels"
 
-    def to_json(self) -> str:
-        import json
-
-        class _SoundingEncoder(json.JSONEncoder):
-            def default(self, x):
-                if isinstance(x, (Sounding.Level, Location)):
-                    return x.__dict__
-                elif isinstance(x, (datetime, time, timedelta)):
-                    return str(x)
-                elif isinstance(x, (P_SRC, NP_SRC, LevelType.Major, LevelType.Minor, QualityFlag)):
-                    return str(x.name).lower()
-                else:
-                    return super().default(x)
-        return json.dumps(self.__dict__, cls=_SoundingEncoder, indent=4)
+    def to_dict(self) -> dict:
+        """ JSON-ready dict : times as strings, enums as lowercase names, (value, flag) as lists """
+        levels = self.levels
+        if isinstance(levels, list):
+            levels = [_level_dict(x) for x in levels]
+        else:
+            # columnar levels
+            levels = [_record_dict(x) for x in levels.tolist()]
+        return {
+            "station": self.station,
+            "obstime": str(self.obstime),
+            "reltime": None if self.reltime is None else str(self.reltime),
+            "nlevels": self.nlevels,
+            "datasource_p": _NAMES.get(self.datasource_p),
+            "datasource_np": _NAMES.get(self.datasource_np),
+            "location": {"lat": self.location.lat, "lon": self.location.lon},
+            "levels": levels
+        }
+
+    def to_json(self, indent: Optional[int] = 4) -> str:
+        if indent is None:
+            return _COMPACT_ENCODER.encode(self.to_dict())
+        if indent not in _ENCODERS:
+            _ENCODERS[indent] = json.JSONEncoder(indent=indent)
+        return _ENCODERS[indent].encode(self.to_dict())
+
+
+_NAMES = {x: x.name.lower() for enum in (P_SRC, NP_SRC, LevelType.Major, LevelType.Minor, QualityFlag) for x in enum}
+_FLAG_NAMES = tuple(_NAMES[x] for x in _FLAGS)
+_MAJOR_NAMES = {x.value: _NAMES[x] for x in LevelType.Major}
+_MINOR_NAMES = {x.value: _NAMES[x] for x in LevelType.Minor}
+_KINDS = (timedelta, int, int, float, float, float, int, float)
+_COMPACT_ENCODER = json.JSONEncoder(separators=(",", ":"))
+_ENCODERS: Dict[int, json.JSONEncoder] = {}
+
+
+def _value(value: float, kind: type):
+    if value != value:  # NaN
+        return None
+    if kind is timedelta:
+        return str(timedelta(seconds=value))
+    return kind(value)
+
+
+def _level_dict(level: Sounding.Level) -> dict:
+    values, flags = level._values, level._flags
+    levels = {"major": _NAMES[level.major], "minor": _NAMES[level.minor]}
+    for i, name in enumerate(Sounding.Level.FIELDS):
+        levels[name] = [_value(values[i], _KINDS[i]), _FLAG_NAMES[flags[i]]]
+    return levels
+
+
+def _record_dict(record: tuple) -> dict:
+    # columnar level : major, minor, then value and flag code of each field
+    levels = {"major": _MAJOR_NAMES[record[0]], "minor": _MINOR_NAMES[record[1]]}
+    for i, name in enumerate(Sounding.Level.FIELDS):
+        levels[name] = [_value(record[2+2*i], _KINDS[i]), _FLAG_NAMES[record[3+2*i]]]
+    return levels
+
+
+class LazySounding(Sounding):
+    """ Sounding keeping its raw level lines, decoded on first access to levels
+
+    Bad level lines are counted in the parser stats when levels get decoded.
+    """
+
+    def __init__(self, sounding: Sounding, columnar=False, stats=None):
+        self.__dict__.update(sounding.__dict__)
+        del self.__dict__["levels"]
+        self.raw: Union[bytes, List[str]] = []
+        self.columnar = columnar
+        self.stats = stats
+
+    @cached_property
+    def levels(self):
+        levels = self.decode(self.raw, self.stats)
+        # from now on a plain sounding
+        del self.raw, self.columnar, self.stats
+        return levels
+
+    def decode(self, raw: Union[bytes, Sequence], stats=None):
+        from pigra.parser import IgraParser
+        lines = raw.splitlines() if isinstance(raw, bytes) else raw
+        if self.columnar:
+            from pigra.columnar import decode_levels
+            levels, valid = decode_levels(lines)
+            warnings = len(lines) - len(levels)
+            levels = levels[:self.nlevels]
+        else:
+            levels, warnings = [], 0
+            for line in lines:
+                try:
+                    level = IgraParser.parse_level(
+                        line.decode("utf-8", "replace") if isinstance(line, bytes) else line)
+                except Exception:
+                    warnings += 1
+                    continue
+                if len(levels) < self.nlevels:
+                    levels.append(level)
+        if stats is not None:
+            stats.warnings += warnings
+        return levels
+
+    def select(self,
+               minor: Optional[LevelType.Minor] = None,
+               pressure: Optional[Tuple[int, int]] = None):
+        # partial decoding : raw lines are checked before being decoded
+        if "levels" in self.__dict__:
+            return super().select(minor, pressure)
+        lines = self.raw.splitlines() if isinstance(self.raw, bytes) else self.raw
+        selected = []
+        for line in lines:
+            try:
+                if minor is not None and int(line[1:2]) != minor.value:
+                    continue
+                if pressure is not None and not pressure[0] <= int(line[9:15]) <= pressure[1]:
+                    continue
+            except ValueError:
+                continue
+            selected.append(line)
+        return self.decode(selected)
+
+    def add(self, level: Sounding.Level):
+        self.levels
+        super().add(level)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sounding):
+            return NotImplemented
+        return all(getattr(self, x.name) == getattr(other, x.name) for x in fields(Sounding))
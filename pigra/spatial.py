@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+
+from math import asin, cos, radians, sin, sqrt
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pigra.sounding import Location, Sounding
+
+EARTH_RADIUS = 6371.0  # km
+
+
+def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # great-circle distance (km)
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * asin(sqrt(min(a, 1.0)))
+
+
+def load_stations(filename: str) -> Dict[str, Location]:
+    """ Station locations from the IGRA station list (igra2-station-list.txt) """
+    stations = {}
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                stations[line[0:11]] = Location(float(line[12:20]), float(line[21:30]))
+            except ValueError:
+                continue
+    return stations
+
+
+class SpatialFilter:
+    """ Geobox and/or radius filter on sounding locations
+
+    bbox is (min_lon, min_lat, max_lon, max_lat) like shapely box(), min_lon
+    may be greater than max_lon for boxes crossing the antimeridian. near is
+    (lat, lon, radius_km). Stations report few distinct locations, so each
+    one is tested once and cached, raw headers are checked without being
+    parsed. Instances are picklable and can be sent to worker processes.
+    """
+
+    def __init__(self,
+                 bbox: Optional[Tuple[float, float, float, float]] = None,
+                 near: Optional[Tuple[float, float, float]] = None):
+        self.bbox = bbox
+        self.near = near
+        self._locations: Dict[Tuple[float, float], bool] = {}
+        self._headers: Dict[str, bool] = {}
+
+    def contains(self, lat: float, lon: float) -> bool:
+        if self.bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = self.bbox
+            if not min_lat <= lat <= max_lat:
+                return False
+            if min_lon <= max_lon and not min_lon <= lon <= max_lon:
+                return False
+            if min_lon > max_lon and max_lon < lon < min_lon:
+                return False
+        if self.near is not None:
+            if distance(self.near[0], self.near[1], lat, lon) > self.near[2]:
+                return False
+        return True
+
+    def __call__(self, sounding: Sounding) -> bool:
+        key = (sounding.location.lat, sounding.location.lon)
+        if (matched:=self._locations.get(key)) is None:
+            matched = self._locations[key] = self.contains(*key)
+        return matched
+
+    def match_header(self, hdr: str) -> bool:
+        """ Tests the location of a raw header line, True if it cannot be read """
+        key = hdr[55:71]
+        if (matched:=self._headers.get(key)) is None:
+            try:
+                matched = self.contains(int(hdr[55:62]) / 10000, int(hdr[63:71]) / 10000)
+            except ValueError:
+                return True  # left to the parser which reports the error
+            self._headers[key] = matched
+        return matched
+
+    def prune(self, filenames: Iterable[str], stations: Optional[Dict[str, Location]] = None) -> List[str]:
+        """ Drops station files whose location is known to be outside the filter
+
+        Locations come from a valid sidecar index (all headers, exact) or from
+        the stations mapping (see load_stations) keyed by the station id the
+        IGRA file names start with. Other files are kept.
+        """
+        from pigra.index import IgraIndex
+        kept = []
+        for filename in filenames:
+            index = IgraIndex.load(filename) if os.path.isfile(filename) else None
+            if index is not None:
+                if any(self.match_header(x.header) for x in index.entries):
+                    kept.append(filename)
+                continue
+            location = (stations or {}).get(os.path.basename(filename)[:11])
+            if location is None or self.contains(location.lat, location.lon):
+                kept.append(filename)
+        return kept
+
+    def __getstate__(self):
+        # caches are rebuilt on the other side
+        return {"bbox": self.bbox, "near": self.near, "_locations": {}, "_headers": {}}
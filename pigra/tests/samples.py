@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# IGRA v2 samples shared by the tests : one sounding, then the same one followed by a second one
+
+igra_sample = [
+    """#GRM00016622 2018 01 01 00 2333    2 ncdc-gts           405272   229714
+21 -9999 102000B-9999    30B-9999    50   120    21
+20 -9999 101600A-9999    66B-9999    60 -9999 -9999
+""",
+    """#GRM00016622 2018 01 01 00 2333    2 ncdc-gts           405272   229714
+21 -9999 102000B-9999    30B-9999    50   120    21
+20 -9999 101600A-9999    66B-9999    60 -9999 -9999
+#GRM00016622 2018 01 02 00 2310    3 ncdc-gts           405272   229714
+21 -9999 101300B-9999    46B-9999    39   120    15
+20 -9999 101000 -9999    74B-9999    31 -9999 -9999
+20 -9999 100700 -9999    82B-9999    39 -9999 -9999
+"""
+]
+
+# a bad level line, a second sounding at 12 UTC and a malformed header
+igra_bad_sample = """#GRM00016622 2018 01 01 00 2333    3 ncdc-gts           405272   229714
+21 -9999 102000B-9999    30B-9999    50   120    21
+20 -9999 101600A-9999    66B-9999    60 -9999 -9999
+20 -9999 xxxxxxA-9999    66B-9999    60 -9999 -9999
+#GRM00016622 2018 01 02 12 9999    1 ncdc-gts ncdc6309  415272   229714
+21 -9999 101300B-9999    46B-9999    39   120    15
+#BADHEADER
+10 -9999 101300B-9999    46B-9999    39   120    15
+"""
+
+# soundings for the quality control checks
+igra_qc_sample = """#GRM00016622 2018 01 01 00 2333    4 ncdc-gts           405272   229714
+21 -9999 100000B  110B  200B-9999   100   180    50
+10 -9999  85000 -9999   -50B-9999   500 -9999 -8888
+10 -9999  90000B 1500B -200B-9999   100   270   100
+10 -9999  50000B 1600B-8888B-9999   100   270   100
+#USM00072250 2018 01 02 00 2310    2 ncdc-gts           405272   229714
+21 -9999 101300B  100B   46B-9999    39   120    15
+20 -9999 101000  1100    74Z-9999    31 -9999 -9999
+#GRM00016622 2018 01 02 00 2310    2 ncdc-gts           405272   229714
+21 -9999 101300B  100B   46B-9999    39   120    15
+20 -9999 100000B  200B  -46B-9999    39   120    15
+"""
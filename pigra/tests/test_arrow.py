@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+
+pytest.importorskip("numpy")
+pa = pytest.importorskip("pyarrow")
+
+from pigra.parser import IgraParser
+from pigra.arrow import export
+from pigra.tests.samples import igra_sample
+
+# elapsed time reported on one level, a third sounding
+sample = igra_sample[1].replace("20 -9999 101000", "20  1230 101000") + igra_sample[0].replace("01 01 00", "01 03 00")
+
+
+def test_export_parquet(tmp_path):
+    import pyarrow.parquet as pq
+    count = export(IgraParser(stream=sample.split("\n")).parse(), str(tmp_path), row_group_size=2)
+    soundings = pq.read_table(tmp_path / "soundings.parquet")
+    levels = pq.read_table(tmp_path / "levels.parquet")
+    assert count == soundings.num_rows
+    assert levels.num_rows == sum(soundings["nlevels"].to_pylist())
+    assert pa.types.is_dictionary(levels.schema.field("pressure_flag").type)
+    assert pa.types.is_dictionary(soundings.schema.field("station").type)
+    assert set(levels["sounding_id"].to_pylist()) == set(soundings["id"].to_pylist())
+
+
+def test_export_columnar(tmp_path):
+    export(IgraParser(stream=sample.split("\n")).parse(), str(tmp_path / "objects"), "arrow")
+    export(IgraParser(stream=sample.split("\n"), columnar=True).parse(), str(tmp_path / "columnar"), "arrow")
+    objects = pa.ipc.open_file(tmp_path / "objects" / "levels.arrow").read_all()
+    columnar = pa.ipc.open_file(tmp_path / "columnar" / "levels.arrow").read_all()
+    assert objects.num_rows == 7
+    assert objects.equals(columnar)
+    assert objects["elapsed"].to_pylist() == [None, None, None, 750, None, None, None]
+
+
+def test_export_arrow_batches(tmp_path):
+    # several record batches in one IPC file
+    count = export(IgraParser(stream=sample.split("\n")).parse(), str(tmp_path), "arrow", row_group_size=2)
+    soundings = pa.ipc.open_file(tmp_path / "soundings.arrow")
+    levels = pa.ipc.open_file(tmp_path / "levels.arrow").read_all()
+    assert soundings.num_record_batches == count == 3
+    soundings = soundings.read_all()
+    assert soundings["station"].to_pylist() == ["GRM00016622"]*3
+    assert soundings["datasource_p"].to_pylist() == ["ncdc_gts"]*3
+    assert soundings["datasource_np"].to_pylist() == [None]*3
+    assert levels.num_rows == 7
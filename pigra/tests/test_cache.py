@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import pytest
+
+from pigra.cache import ParseCache
+from pigra.filters import Filter
+from pigra.parser import IgraParser
+from pigra.tests.samples import igra_bad_sample
+
+
+def test_cache(tmp_path):
+    filename = tmp_path / "GRM00016622-data.txt"
+    filename.write_text(igra_bad_sample)
+    cache = ParseCache(tmp_path / "cache")
+    for columnar in (False, True):
+        for f_match in (lambda x: True, Filter(hours=[12])):
+            parser = IgraParser.from_file(str(filename), f_match, columnar=columnar)
+            expected = [x.to_json() for x in parser.parse()]
+            for _ in range(2):  # miss then hit
+                cached = IgraParser.from_file(str(filename), f_match, columnar=columnar, cache=cache)
+                assert [x.to_json() for x in cached.parse()] == expected
+                assert cached.stats == parser.stats
+    # one entry whatever the mode
+    assert len([x for x in os.listdir(cache.directory) if x.endswith(".json")]) == 1
+    assert not [x for x in os.listdir(cache.directory) if x.endswith(".tmp")]
+    # out of date entry is never hit
+    filename.write_text(igra_bad_sample.split("#GRM00016622 2018 01 02")[0])
+    parser = IgraParser.from_file(str(filename), cache=cache)
+    assert len(list(parser.parse())) == 1 and parser.stats.lines == 4
+
+
+def test_unsupported(tmp_path, monkeypatch):
+    filename = tmp_path / "data.txt"
+    filename.write_text(igra_bad_sample)
+    with pytest.raises(ValueError):
+        IgraParser.from_file(str(filename), cache=ParseCache(tmp_path / "cache"), profile=True)
+    # default cache skipped
+    monkeypatch.setenv("PIGRA_CACHE", str(tmp_path / "cache"))
+    parser = IgraParser.from_file(str(filename), hook=lambda x: None)
+    assert parser.cache is None and len(list(parser.parse())) == 2
+    assert parser.stats.profile is not None
+
+
+def test_eviction(tmp_path):
+    cache = ParseCache(tmp_path / "cache", max_size=0)
+    filename = tmp_path / "data.txt"
+    filename.write_text(igra_bad_sample)
+    assert len(list(IgraParser.from_file(str(filename), cache=cache).parse())) == 2
+    assert os.listdir(cache.directory) == []
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import math
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from pigra.parser import IgraParser
+from pigra.constants import LevelType, QualityFlag
+from pigra.columnar import LEVEL_DTYPE, QUALITY_FLAGS, levels_array, parse_levels
+from pigra.tests.samples import igra_sample
+
+# elapsed time reported on one level
+sample = igra_sample[1].replace("20 -9999 101000", "20  1230 101000")
+
+
+def test_levels_array():
+    lines = sample.split("\n")[1:3]
+    levels = parse_levels(lines)
+    assert levels.dtype == LEVEL_DTYPE
+    assert len(levels) == 2
+    level = levels[0]
+    assert level["major"] == LevelType.Major.OTHER.value
+    assert level["minor"] == LevelType.Minor.SURFACE.value
+    assert math.isnan(level["elapsed"])
+    assert QUALITY_FLAGS[level["elapsed_flag"]] == QualityFlag.MISSING
+    assert level["pressure"] == 102000
+    assert QUALITY_FLAGS[level["pressure_flag"]] == QualityFlag.PASSED
+    assert math.isnan(level["height"])
+    assert QUALITY_FLAGS[level["height_flag"]] == QualityFlag.UNCHECKED
+    assert level["temperature"] == 3.0
+    assert level["dewpoint"] == 5.0
+    assert level["winddir"] == 120
+    assert level["windspeed"] == 2.1
+    assert QUALITY_FLAGS[levels[1]["pressure_flag"]] == QualityFlag.TIERS1
+    assert QUALITY_FLAGS[levels[1]["windspeed_flag"]] == QualityFlag.MISSING
+
+
+def test_levels_array_elapsed():
+    levels = parse_levels(["20  1230 101000 -9999    74B-9999    31 -9999 -9999"])
+    assert levels[0]["elapsed"] == 12 * 60 + 30
+    assert QUALITY_FLAGS[levels[0]["elapsed_flag"]] == QualityFlag.PASSED
+
+
+def test_levels_array_bad_lines():
+    lines = ["21 -9999 102000B-9999    30B-9999    50   120    2",
+             "41 -9999 102000B-9999    30B-9999    50   120    21",
+             "21 -9999 102000B-9999    3XB-9999    50   120    21",
+             "21 -9999 102000B-9999    30B-9999    50   120    21"]
+    assert len(parse_levels(lines)) == 1
+    assert len(parse_levels([])) == 0
+
+
+def test_columnar_sample():
+    stream = sample.split("\n")
+    stream.remove("")
+    parser = IgraParser(stream, columnar=True)
+    soundings = [x for x in parser.parse()]
+    assert len(soundings) == 2
+    assert len(soundings[0].levels) == 2
+    assert len(soundings[1].levels) == 3
+    assert soundings[1].levels[2]["temperature"] == 8.2
+    assert parser.stats == IgraParser.Stats(lines=7, null=0, records=2, processed=2, filtered=0, errors=0, warnings=0)
+
+
+def test_columnar_matches_levels():
+    # same levels, values, flags and stats whatever the mode, quirky elapsed times included
+    stream = sample.split("\n")[:4] + [
+        "#GRM00016622 2018 01 03 00 2310    6 ncdc-gts           405272   229714",
+        "20   130 101000 -9999    74B-9999    31 -9999 -9999",
+        "20   730 100900 -9999   -74B-8888    31   120 -8888",
+        "20 10030 100800 -9999    74B-9999    31 -9999 -9999",
+        "20    12  -9999B  100A 1x4 B-9999    31 -9999 -9999",
+        "20 -8888 100700 -9999    74B-9999   +31 -9999 -9999",
+        "20 1 2 3 100600 -9999    74B-9999    31 -9999 -9999"]
+    parser, columnar = IgraParser(stream), IgraParser(stream, columnar=True)
+    for sounding, other in zip(columnar.parse(), parser.parse()):
+        assert sounding.header() == other.header()
+        assert levels_array(other.levels).tobytes() == sounding.levels.tobytes()
+    assert parser.stats == columnar.stats
+    assert parser.stats.warnings == 3
+    assert list(sounding.levels["elapsed"][:2]) == [780, 450]
+    assert QUALITY_FLAGS[sounding.levels[2]["elapsed_flag"]] == QualityFlag.REMOVED
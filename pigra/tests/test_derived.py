@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from pigra.parser import IgraParser
+from pigra import derived
+
+igra_sample = """#GRM00016622 2018 01 01 00 2333    3 ncdc-gts           405272   229714
+21 -9999 100000B  110B  200B-9999   100   180    50
+10 -9999  85000 -9999   -50B-9999   500 -9999 -8888
+10 -9999  50000B 5700B -200B-9999   100   270   100
+#GRM00016622 2018 01 02 00 2310    2 ncdc-gts           405272   229714
+21 -9999 101300B  100B   46B-9999    39   120    15
+20 -9999 101000 -9999    74B-9999    31 -9999 -9999
+"""
+
+
+def soundings(columnar=False):
+    return list(IgraParser(igra_sample.split("\n"), columnar=columnar).parse())
+
+
+def test_derived_sounding():
+    sounding = soundings()[0]
+    assert derived.dewpoint(sounding)[0] == pytest.approx(10.0)
+    assert derived.relative_humidity(sounding)[0] == pytest.approx(52.5, abs=0.5)
+    assert derived.potential_temperature(sounding)[0] == pytest.approx(293.15)
+    u, v = derived.wind_components(sounding)
+    assert u[0] == pytest.approx(0) and v[0] == pytest.approx(5)
+    assert u[2] == pytest.approx(10) and v[2] == pytest.approx(0)
+    assert np.isnan(u[1])
+    assert derived.mixing_ratio(sounding)[0] == pytest.approx(0.00766, abs=1e-4)
+
+
+def test_interpolate_height():
+    levels, offsets = derived.batch(soundings())
+    assert list(offsets) == [0, 3, 5]
+    height = derived.interpolate_height(levels, offsets)
+    expected = 110 + (5700 - 110) * np.log(100000 / 85000) / np.log(100000 / 50000)
+    assert height[1] == pytest.approx(expected)
+    assert np.isnan(height[4])  # not extrapolated nor taken from the previous sounding
+
+
+def test_derive_columnar():
+    objects, columnar = derived.batch(soundings()), derived.batch(soundings(columnar=True))
+    expected, result = derived.derive(*objects), derived.derive(*columnar)
+    for name in expected.dtype.names:
+        assert np.array_equal(expected[name], result[name], equal_nan=True)
+
+
+def test_interpolate():
+    result = derived.interpolate(soundings(), pressures=(100000, 85000, 70000, 50000, 1000),
+                                 variables=("height", "temperature", "u"), chunk=1)
+    assert result.shape == (2, 5, 3)
+    assert result[0, 0, 0] == 110 and result[0, 3, 0] == 5700
+    expected = 110 + (5700 - 110) * np.log(100000 / 70000) / np.log(100000 / 50000)
+    assert result[0, 2, 0] == pytest.approx(expected)
+    assert result[0, 1, 1] == -5.0  # standard level taken as is
+    assert result[0, 2, 2] == pytest.approx(10 * np.log(100000 / 70000) / np.log(2))
+    assert np.isnan(result[0, 4]).all()  # never extrapolated
+    assert np.isnan(result[1]).all()
+
+
+def test_interpolate_standard_first():
+    sample = """#GRM00016622 2018 01 01 00 2333    3 ncdc-gts           405272   229714
+20 -9999  85000B-9999   -40B-9999   500 -9999 -8888
+10 -9999  85000B-9999   -50B-9999   500 -9999 -8888
+20 -9999  70000B-9999   -60B-9999   500 -9999 -8888
+"""
+    result = derived.interpolate(IgraParser(sample.split("\n")).parse(), pressures=(85000,), variables=("temperature",))
+    assert result[0, 0, 0] == -5.0
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pickle
+
+from datetime import datetime, timezone
+
+from pigra.parser import IgraParser
+from pigra.constants import P_SRC
+from pigra.filters import Filter
+from pigra.tests.samples import igra_sample
+
+# second sounding of unknown hour and datasource, third one from another station
+sample = igra_sample[1].replace("02 00 2310    3 ncdc-gts", "02 99 2310    3         ") + \
+    igra_sample[0].replace("GRM00016622 2018 01 01 00 2333", "FRM00007145 2018 01 02 12 1110").replace("405272   229714", "487733    20100")
+
+
+def check(f_match: Filter, count: int):
+    # raw header checks agree with checks on parsed soundings
+    expected = [x for x in IgraParser(sample.split("\n")).parse() if f_match(x)]
+    parser = IgraParser(sample.split("\n"), pickle.loads(pickle.dumps(f_match)))
+    assert [x for x in parser.parse()] == expected
+    assert len(expected) == count and parser.stats.filtered == 3 - count
+
+
+def test_filter():
+    check(Filter(), 3)
+    check(Filter(stations=["GRM00016622"]), 2)
+    check(Filter(start=datetime(2018, 1, 1, 0, 1), end=datetime(2018, 1, 2, 12, tzinfo=timezone.utc)), 2)
+    check(Filter(start=datetime(2018, 1, 2)), 2)
+    check(Filter(hours=[0]), 2)  # missing hour read as 00
+    check(Filter(hours=[12]), 1)
+    check(Filter(bbox=(19.3, 34.8, 29.6, 41.7)), 2)
+    check(Filter(datasource_p=[P_SRC.ncdc_gts]), 2)
+    check(Filter(datasource_p=[None]), 1)
+    check(Filter(min_levels=3), 1)
+    check(Filter(stations=["GRM00016622"], hours=[0, 12], min_levels=1), 2)
+
+
+def test_filter_header():
+    f_match = Filter(stations=["FRM00007145"])
+    assert not f_match.match_header(sample.split("\n")[0])
+    assert f_match.match_header("#GRM00016622")  # bad headers left to the parser
+    parser = IgraParser(sample.split("\n") + ["#GRM00016622 2018"], f_match)
+    assert len([x for x in parser.parse()]) == 1
+    assert parser.stats.errors == 1
+
+
+def test_filter_prune():
+    f_match = Filter(stations=["GRM00016622"])
+    files = ["data/GRM00016622-data.txt.zip", "data/FRM00007145-data.txt.zip", "merged.txt"]
+    assert f_match.prune(files) == ["data/GRM00016622-data.txt.zip", "merged.txt"]
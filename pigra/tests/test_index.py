@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timezone
+
+from pigra.parser import IgraParser
+from pigra.index import IgraIndex
+from pigra.tests.samples import igra_sample
+
+
+def test_build(tmp_path):
+    filename = tmp_path / "GRM00016622-data.txt"
+    filename.write_text(igra_sample[1])
+    index = IgraIndex.build(str(filename))
+    assert [(x.offset, x.length) for x in index.entries] == [(0, 176), (176, 228)]
+    assert index.entries[1].header == igra_sample[1].split("\n")[3]
+
+
+def test_save_load(tmp_path):
+    filename = tmp_path / "GRM00016622-data.txt"
+    filename.write_text(igra_sample[1])
+    index = IgraIndex.open(str(filename))
+    assert (tmp_path / "GRM00016622-data.txt.idx").exists()
+    assert IgraIndex.load(str(filename)).entries == index.entries
+    filename.write_text(igra_sample[1] * 2)  # stale index
+    assert IgraIndex.load(str(filename)) is None
+    assert len(IgraIndex.open(str(filename)).entries) == 4
+
+
+def test_from_index(tmp_path):
+    filename = tmp_path / "GRM00016622-data.txt"
+    filename.write_text(igra_sample[1])
+    day = datetime(2018, 1, 2, tzinfo=timezone.utc)
+    parser = IgraParser.from_index(str(filename), lambda x: x.obstime == day)
+    soundings = [x for x in parser.parse()]
+    assert len(soundings) == 1
+    assert soundings[0].obstime == day
+    assert len(soundings[0].levels) == 3
+    assert parser.stats == IgraParser.Stats(lines=4, null=0, records=2, processed=1, filtered=1, errors=0, warnings=0)
+    parser.reset()
+    assert [x for x in parser.parse()] == soundings
+    # headers matched once, by the index selection
+    calls = []
+    parser = IgraParser.from_index(str(filename), lambda x: calls.append(x.obstime) or x.obstime == day)
+    assert len([x for x in parser.parse()]) == 1 and len(calls) == 2
+
+
+def test_from_index_headers_only(tmp_path):
+    filename = tmp_path / "GRM00016622-data.txt"
+    filename.write_text(igra_sample[1])
+    parser = IgraParser.from_index(str(filename), headers_only=True)
+    soundings = [x for x in parser.parse()]
+    assert [x.nlevels for x in soundings] == [2, 3]
+    assert parser.stats == IgraParser.Stats(lines=2, null=0, records=2, processed=2, filtered=0, errors=0, warnings=0)
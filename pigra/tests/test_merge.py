@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+
+from datetime import datetime, timedelta, timezone
+
+from pigra.merge import BUFFER_SIZE, MergedIgraParser, synoptic_time
+from pigra.parser import IgraParser
+
+level = "21 -9999 102000B-9999    30B-9999    50   120    21\n"
+
+
+def header(station: str, date: str) -> str:
+    return f"#{station} {date} 2333    1 ncdc-gts           405272   229714\n"
+
+
+def test_merge(tmp_path):
+    dates = {"GRM00016622": ["2018 01 01 00", "2018 01 01 12", "2018 01 02 11", "2018 01 03 00"],
+             "USM00072250": ["2018 01 01 01", "2018 01 01 12", "2018 01 01 15", "2018 01 02 13"],
+             "ASM00094703": []}
+    filenames = []
+    for station, times in dates.items():
+        filenames.append(str(tmp_path / f"{station}-data.txt"))
+        with open(filenames[-1], "w") as f:
+            f.writelines(header(station, x) + level for x in times)
+    merged = IgraParser.from_merge(filenames)
+    soundings = list(merged.parse())
+    assert [x.obstime for x in soundings] == sorted(x.obstime for x in soundings)
+    assert [x.station for x in soundings][1:4] == ["USM00072250", "GRM00016622", "USM00072250"]
+    assert merged.stats.processed == 8 and merged.stats.lines == 16
+    # no reader thread and small buffers per input
+    assert all(x.reader == {"threaded": False, "buffering": BUFFER_SIZE} for x in merged.parsers)
+    with open(filenames[0], "rb") as f, gzip.open(filenames[0] + ".gz", "wb") as gz:
+        gz.write(f.read())
+    merged = IgraParser.from_merge([filenames[0] + ".gz"] + filenames[1:])
+    assert isinstance(merged.parsers[0].stream.buffer, gzip.GzipFile)
+    assert len(list(merged.parse())) == 8
+    merged = MergedIgraParser(IgraParser.from_file(x, epoch=True) for x in filenames)
+    windows = [(time, [x.station[:3] for x in group]) for time, group in merged.windows(hours=(0, 12))]
+    assert windows == [(datetime(2018, 1, 1, 0, tzinfo=timezone.utc), ["GRM", "USM"]),
+                       (datetime(2018, 1, 1, 12, tzinfo=timezone.utc), ["GRM", "USM"]),
+                       (datetime(2018, 1, 2, 12, tzinfo=timezone.utc), ["GRM", "USM"]),
+                       (datetime(2018, 1, 3, 0, tzinfo=timezone.utc), ["GRM"])]
+    merged.reset()
+    assert len(list(merged.windows(hours=(0, 12), tolerance=timedelta(0)))) == 3
+
+
+def test_synoptic_time():
+    day = 1514764800  # 2018-01-01 00Z
+    assert synoptic_time(day + 2*3600) == day
+    assert synoptic_time(day + 3*3600) == day  # tie, earliest
+    assert synoptic_time(day + 22*3600, (0, 12)) == day + 86400
+    assert synoptic_time(day - 3600, (6, 18)) == day - 6*3600
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from pigra.parser import IgraParser
+from pigra.parallel import ParallelIgraParser, byte_ranges
+from pigra.tests.samples import igra_sample
+
+
+def three_levels(sounding):
+    return sounding.nlevels == 3
+
+
+def write_samples(tmp_path):
+    filenames = []
+    for station in ("GRM00016623", "GRM00016621", "GRM00016622"):
+        filename = tmp_path / f"{station}-data.txt"
+        filename.write_text(igra_sample[1].replace("GRM00016622", station) * 50)
+        filenames.append(str(filename))
+    return filenames
+
+
+def test_ordered(tmp_path):
+    filenames = write_samples(tmp_path)
+    expected, stats = [], IgraParser.Stats()
+    for filename in sorted(filenames):
+        parser = IgraParser.from_file(filename)
+        expected.extend(parser.parse())
+        stats = stats + parser.stats
+    parser = IgraParser.from_files(filenames, workers=2, ordered=True, batch=7)
+    assert [x for x in parser.parse()] == expected
+    assert parser.stats == stats
+    assert parser.stats == IgraParser.Stats(lines=1050, null=0, records=300, processed=300, filtered=0, errors=0, warnings=0)
+
+
+def test_unordered_filtered(tmp_path):
+    filenames = write_samples(tmp_path)
+    parser = ParallelIgraParser(filenames, three_levels, workers=2, prefetch=1, batch=3)
+    soundings = [x for x in parser.parse()]
+    assert len(soundings) == 150
+    assert all(x.nlevels == 3 for x in soundings)
+    assert parser.stats == IgraParser.Stats(lines=1050, null=0, records=300, processed=150, filtered=150, errors=0, warnings=0)
+    assert len([x for x in parser.parse()]) == 150  # stats of a new run only
+    assert parser.stats == IgraParser.Stats(lines=1050, null=0, records=300, processed=150, filtered=150, errors=0, warnings=0)
+
+
+def test_errors(tmp_path):
+    filenames = write_samples(tmp_path)
+    parser = ParallelIgraParser(filenames + [str(tmp_path / "missing.txt")], workers=2)
+    assert len([x for x in parser.parse()]) == 300
+    assert parser.stats.errors == 1
+    parser = ParallelIgraParser(filenames, lambda x: True, workers=2)  # not picklable
+    assert len([x for x in parser.parse()]) == 0
+    assert parser.stats.errors == 3
+
+
+def test_byte_ranges(tmp_path):
+    filename = write_samples(tmp_path)[0]
+    data = open(filename, "rb").read()
+    ranges = byte_ranges(filename, 1000)
+    assert len(ranges) > 1
+    assert ranges[-1][2] is None
+    assert all(data[start:start+1] == b"#" for _, start, _ in ranges)
+    assert all(x[2] == y[1] for x, y in zip(ranges, ranges[1:]))
+    assert byte_ranges(filename, len(data)) == [(filename, 0, None)]
+
+
+def test_split_file(tmp_path):
+    filename = write_samples(tmp_path)[0]
+    parser = IgraParser.from_file(filename)
+    expected = [x for x in parser.parse()]
+    other = IgraParser.from_files([filename], workers=2, ordered=True, chunk_size=1000)
+    assert len(other.tasks()) > 1
+    assert [x for x in other.parse()] == expected
+    assert other.stats == parser.stats
+
+
+def test_split_file_unordered(tmp_path):
+    # byte ranges of a file come back in file order, whatever the order of files
+    filenames = []
+    for station in ("GRM00016621", "GRM00016622"):
+        filenames.append(str(tmp_path / f"{station}-data.txt"))
+        with open(filenames[-1], "w") as f:
+            f.writelines(igra_sample[0].replace("GRM00016622 2018 01 01 00", f"{station} 2018 01 {1+i//24:02d} {i%24:02d}")
+                         for i in range(240))
+    parser = IgraParser.from_files(filenames, workers=2, chunk_size=1000, batch=3, prefetch=1)
+    assert len(parser.tasks()) > 20
+    soundings = [x for x in parser.parse()]
+    for station in ("GRM00016621", "GRM00016622"):
+        obstimes = [x.obstime for x in soundings if x.station == station]
+        assert len(obstimes) == 240 and obstimes == sorted(obstimes)
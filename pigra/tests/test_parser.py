@@ -4,27 +4,14 @@
 import pytest
 import pkg_resources
 
+from dataclasses import FrozenInstanceError
 from datetime import datetime, time, timezone
 
 from pigra.parser import IgraParser, SoundingException
 from pigra.sounding import Sounding, Location
 from pigra.constants import P_SRC, LevelType, QualityFlag
 from pigra.utils import stream_from
-
-igra_sample = [
-    """#GRM00016622 2018 01 01 00 2333    2 ncdc-gts           405272   229714
-21 -9999 102000B-9999    30B-9999    50   120    21
-20 -9999 101600A-9999    66B-9999    60 -9999 -9999
-""",
-    """#GRM00016622 2018 01 01 00 2333    2 ncdc-gts           405272   229714
-21 -9999 102000B-9999    30B-9999    50   120    21
-20 -9999 101600A-9999    66B-9999    60 -9999 -9999
-#GRM00016622 2018 01 02 00 2310    3 ncdc-gts           405272   229714
-21 -9999 101300B-9999    46B-9999    39   120    15
-20 -9999 101000 -9999    74B-9999    31 -9999 -9999
-20 -9999 100700 -9999    82B-9999    39 -9999 -9999
-"""
-]
+from pigra.tests.samples import igra_sample
 
 
 def test_header_success_1():
@@ -204,6 +191,60 @@ def test_level_success_2_3():
     assert level == expected
 
 
+def test_decoding_tables():
+    # arithmetic elapsed/release times read like strptime, quirks included
+    from itertools import product
+    from pigra.parser import _elapsed, _reltime
+
+    def strptime(value, fmt):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            return None
+
+    for value in map("".join, product("0 1567", repeat=5)):
+        dt = strptime(value.strip(), "%M%S")
+        try:
+            seconds = _elapsed(value)
+        except ValueError:
+            seconds = None
+        assert seconds == (None if dt is None else dt.minute*60 + dt.second), value
+    for value in map("".join, product("0239", repeat=4)):
+        dt = strptime(value[:2], "%H") if value[2:] == "99" else strptime(value, "%H%M")
+        try:
+            reltime = _reltime(value)
+        except ValueError:
+            reltime = False
+        assert reltime == (None if value == "9999" else False if dt is None else dt.time()), value
+    assert _elapsed("  130") == 780
+    with pytest.raises(ValueError):
+        _elapsed("    5")
+    # unknown codes raise ValueError, as the Enum calls did
+    for line in ("40 -9999 102000B-9999    30B-9999    50   120    21",
+                 "2x -9999 102000B-9999    30B-9999    50   120    21"):
+        with pytest.raises(ValueError):
+            IgraParser.parse_level(line)
+    for header in ("#GRM00016622 2018 01 01 00 2333    2 ncdc-xxx           405272   229714",
+                   "#GRM00016622 2018 01 01 00 2333    2 ncdc-gts ncdc-xxx  405272   229714"):
+        with pytest.raises(ValueError):
+            IgraParser.parse_header(header)
+
+
+def test_interned_headers():
+    stream = (igra_sample[0] + igra_sample[0].replace("2018 01 01 00", "2018 01 02 12")).split("\n")
+    first, second = IgraParser(stream).parse()
+    assert first.location is second.location and first.station is second.station
+    with pytest.raises(FrozenInstanceError):
+        first.location.lat = 0.0
+    parser = IgraParser(stream, epoch=True)
+    soundings = list(parser.parse())
+    assert soundings == [first, second]
+    assert "obstime" not in soundings[1].__dict__ and soundings[1].epoch == 1514894400
+    assert soundings[1].obstime == datetime(2018, 1, 2, 12, tzinfo=timezone.utc) and second.epoch == 1514894400
+    with pytest.raises(ValueError):
+        IgraParser.parse_header(igra_sample[0].split("\n")[0].replace("01 01 00", "02 30 00"), epoch=True)
+
+
 def test_sample0():
     stream = igra_sample[0].split("\n")
     stream.remove("")
@@ -233,3 +274,176 @@ def test_complete_file():
     parser = IgraParser(stream)
     parser.analyze()    
     assert parser.stats == IgraParser.Stats(lines=1152034, null=0, records=25801, processed=25801, filtered=0, errors=0, warnings=277)
+
+
+def test_sample1_skip_filtered():
+    stream = igra_sample[1].split("\n")
+    stream.remove("")
+    parser = IgraParser(stream, lambda x: x.nlevels == 3, skip_filtered=True)
+    soundings = [x for x in parser.parse()]
+    assert len(soundings) == 1
+    assert len(soundings[0].levels) == 3
+    assert parser.stats == IgraParser.Stats(lines=7, null=0, records=2, processed=1, filtered=1, errors=0, warnings=0)
+    # headers rejected before parsing (bbox, near, Filter) skip their levels too : one
+    # more level announced swallows the next header
+    stream[0] = stream[0].replace("   2 ncdc", "   3 ncdc")
+    parser = IgraParser(stream, bbox=(0, 0, 10, 10), skip_filtered=True)
+    assert [x for x in parser.parse()] == []
+    assert parser.stats == IgraParser.Stats(lines=7, null=0, records=1, processed=0, filtered=1, errors=0, warnings=0)
+
+
+def test_sample1_headers_only():
+    stream = igra_sample[1].split("\n")
+    stream.remove("")
+    for skip_filtered in (False, True):
+        parser = IgraParser(stream, headers_only=True, skip_filtered=skip_filtered)
+        soundings = [x for x in parser.parse()]
+        assert [x.nlevels for x in soundings] == [2, 3]
+        assert all(len(x.levels) == 0 for x in soundings)
+        assert parser.stats == IgraParser.Stats(lines=7, null=0, records=2, processed=2, filtered=0, errors=0, warnings=0)
+
+
+def test_sample1_bad_header():
+    stream = igra_sample[1].split("\n")
+    stream.remove("")
+    stream[3] = stream[3][:-1]
+    parser = IgraParser(stream)
+    soundings = [x for x in parser.parse()]
+    assert len(soundings) == 1
+    assert len(soundings[0].levels) == 2
+    assert parser.stats == IgraParser.Stats(lines=7, null=0, records=1, processed=1, filtered=0, errors=1, warnings=0)
+
+
+def test_sample1_buffer():
+    parser = IgraParser.from_buffer(igra_sample[1].encode())
+    soundings = [x for x in parser.parse()]
+    assert soundings == [x for x in IgraParser(igra_sample[1].split("\n")[:-1]).parse()]
+    assert parser.stats == IgraParser.Stats(lines=7, null=0, records=2, processed=2, filtered=0, errors=0, warnings=0)
+    # windows line endings and a blank level line read as by bytes.splitlines
+    parser = IgraParser.from_buffer(igra_sample[1].replace("\n20 -9999 101000", "\n\n20 -9999 101000").replace("\n", "\r\n").encode())
+    assert [x for x in parser.parse()] == soundings
+    assert parser.stats == IgraParser.Stats(lines=8, null=0, records=2, processed=2, filtered=0, errors=0, warnings=1)
+
+
+def test_sample1_buffer_filtered():
+    parser = IgraParser.from_buffer(("garbage\n" + igra_sample[1]).encode(), lambda x: x.nlevels == 3)
+    soundings = [x for x in parser.parse()]
+    assert len(soundings) == 1
+    assert len(soundings[0].levels) == 3
+    assert parser.stats == IgraParser.Stats(lines=8, null=0, records=2, processed=1, filtered=1, errors=0, warnings=0)
+
+
+def test_sample1_mmap(tmp_path):
+    filename = tmp_path / "GRM00016622-data.txt"
+    filename.write_text(igra_sample[1])
+    parser = IgraParser.from_file(str(filename), mmap=True)
+    assert parser.buffer is not None
+    assert len([x for x in parser.parse()]) == 2
+    parser.reset()
+    assert len([x for x in parser.parse()]) == 2
+    assert parser.stats == IgraParser.Stats(lines=7, null=0, records=2, processed=2, filtered=0, errors=0, warnings=0)
+
+
+def test_sample1_lazy():
+    stream = igra_sample[1].split("\n")
+    stream.remove("")
+    stream.insert(2, "21 -9999 102000B-9999    30B-9999    50   120")
+    expected = [x for x in IgraParser(stream).parse()]
+    parser = IgraParser(stream, lazy=True)
+    soundings = [x for x in parser.parse()]
+    assert all("levels" not in x.__dict__ for x in soundings)
+    assert parser.stats == IgraParser.Stats(lines=8, null=0, records=2, processed=2, filtered=0, errors=0, warnings=0)
+    assert soundings[1].select(minor=LevelType.Minor.SURFACE) == expected[1].levels[:1]
+    assert soundings[1].select(pressure=(100000, 101200)) == expected[1].levels[1:]
+    assert soundings == expected
+    assert parser.stats.warnings == 1
+    assert soundings[0].to_json() == expected[0].to_json()
+
+
+def test_sample1_lazy_buffer():
+    expected = [x for x in IgraParser.from_buffer(igra_sample[1].encode()).parse()]
+    parser = IgraParser.from_buffer(igra_sample[1].encode(), lazy=True)
+    soundings = [x for x in parser.parse()]
+    assert isinstance(soundings[0].raw, bytes)
+    assert soundings[0].select(minor=LevelType.Minor.SURFACE) == expected[0].levels[:1]
+    assert soundings == expected
+    assert parser.stats == IgraParser.Stats(lines=7, null=0, records=2, processed=2, filtered=0, errors=0, warnings=0)
+
+
+def test_sample1_profile():
+    stream = igra_sample[1].split("\n")
+    expected = [x for x in IgraParser(stream).parse()]
+    calls = []
+    parser = IgraParser(stream, profile=True, hook=calls.append)
+    soundings = [x for x in parser.parse()]
+    assert soundings == expected
+    assert parser.stats == IgraParser.Stats(lines=8, null=1, records=2, processed=2, filtered=0, errors=0, warnings=0)
+    profile = parser.stats.profile
+    assert profile.levels == 5 and profile.bytes == len(igra_sample[1]) - 7
+    assert profile.header_ns > 0 and profile.level_ns > 0
+    assert calls[-1] is parser.stats
+    assert parser.stats.rates()["levels"] > 0
+    assert "parse_level" not in parser.__dict__
+
+
+def match_all(sounding):
+    return True
+
+
+def test_sample1_aparse():
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    async def collect(soundings):
+        return [x async for x in soundings]
+
+    async def chunks(data: bytes, size: int):
+        for i in range(0, len(data), size):
+            yield data[i:i+size]
+
+    async def parse(**options):
+        parser = IgraParser(None)
+        return parser, [x async for x in parser.aparse(**options)]
+
+    expected = [x for x in IgraParser(igra_sample[1].split("\n")).parse()]
+    for size in (1, 10, 1000):
+        parser, soundings = asyncio.run(parse(source=chunks(igra_sample[1].encode(), size)))
+        assert soundings == expected
+        assert parser.stats == IgraParser.Stats(lines=7, null=0, records=2, processed=2, filtered=0, errors=0, warnings=0)
+    with ThreadPoolExecutor(1) as executor:
+        parser, soundings = asyncio.run(parse(source=chunks(igra_sample[1].encode(), 100), executor=executor))
+    assert soundings == expected
+    assert parser.stats == IgraParser.Stats(lines=7, null=0, records=2, processed=2, filtered=0, errors=0, warnings=0)
+    with ProcessPoolExecutor(1) as executor:
+        parser = IgraParser(None, match_all)  # picklable
+        soundings = asyncio.run(collect(parser.aparse(chunks(igra_sample[1].encode(), 100), executor)))
+    assert soundings == expected
+    assert parser.stats == IgraParser.Stats(lines=7, null=0, records=2, processed=2, filtered=0, errors=0, warnings=0)
+    with pytest.raises(ValueError):
+        asyncio.run(collect(IgraParser(None, profile=True).aparse(chunks(b"", 1))))
+
+
+def test_sample1_incremental(tmp_path):
+    filename = str(tmp_path / "GRM00016622-data-y2d.txt")
+    data = igra_sample[1]
+    cut = data.index("#GRM00016622 2018 01 02") + 150  # second sounding partially written
+    with open(filename, "w") as f:
+        f.write(data[:cut])
+    parser = IgraParser.from_checkpoint(filename)
+    assert [x.obstime.day for x in parser.parse()] == [1]
+    assert parser.stats == IgraParser.Stats(lines=3, null=0, records=1, processed=1, filtered=0, errors=0, warnings=0)
+    parser = IgraParser.from_checkpoint(filename)
+    assert [x for x in parser.parse()] == []
+    with open(filename, "a") as f:
+        f.write(data[cut:])
+    parser = IgraParser.from_checkpoint(filename, follow=True, interval=0)
+    soundings = parser.parse()
+    assert next(soundings).obstime.day == 2
+    soundings.close()  # checkpoint saved only once all soundings of a poll are consumed
+    parser = IgraParser.from_checkpoint(filename)
+    assert [x.obstime.day for x in parser.parse()] == [2]
+    parser = IgraParser.from_checkpoint(filename)
+    assert [x for x in parser.parse()] == []
+    assert parser.stats == IgraParser.Stats(lines=7, null=0, records=2, processed=2, filtered=0, errors=0, warnings=0)
+    with pytest.raises(ValueError):
+        IgraParser.from_checkpoint(filename, profile=True)
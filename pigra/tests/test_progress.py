@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+
+from io import StringIO
+
+from pigra.parser import IgraParser
+from pigra.progress import Progress
+from pigra.tests.samples import igra_sample
+
+
+def test_progress_json():
+    out = StringIO()
+    progress = Progress(2*len(igra_sample[1]), out, machine=True)
+    for _ in range(2):
+        stream = StringIO(igra_sample[1])
+        progress.next(stream.tell)
+        parser = IgraParser(stream, hook=progress, hook_interval=0)
+        assert len(list(parser.parse())) == 2
+        progress.next(lambda: 0, parser.stats, len(igra_sample[1]))
+    reports = [json.loads(x) for x in out.getvalue().splitlines()]
+    assert reports[-1]["lines"] == 14 and reports[-1]["soundings"] == 4
+    assert reports[-1]["bytes"] == reports[-1]["size"]
+    assert reports[-1]["eta"] == 0
+
+
+def test_progress_text():
+    out = StringIO()
+    progress = Progress(out=out)
+    progress(IgraParser.Stats(lines=10, processed=2))
+    assert "lines/s" in out.getvalue() and "ETA" not in out.getvalue()
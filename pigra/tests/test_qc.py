@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from pigra.parser import IgraParser
+from pigra.qc import QualityControl
+from pigra.tests.samples import igra_qc_sample
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_quality_control(columnar):
+    parser = IgraParser(igra_qc_sample.split("\n"), columnar=columnar)
+    qc = QualityControl(masks=True, stats=parser.stats)
+    (soundings, result), = qc.results(parser.parse())
+    assert len(soundings) == 3
+    assert list(result.offsets) == [0, 4, 6, 8]
+    assert result.masks["pressure_order"].tolist() == [False, False, True, False, False, False, False, False]
+    # 9.2 degrees cooling over 100 gpm
+    assert result.masks["lapse_rate"].tolist() == [False]*7 + [True]
+    assert list(result.failed) == [1, 0, 1]
+    assert parser.stats.warnings == 2 and parser.stats.errors == 1
+    grm = qc.stations["GRM00016622"].to_dict()
+    assert grm["soundings"] == 2 and grm["levels"] == 6
+    assert grm["flags"]["windspeed"] == {"removed": 1}
+    assert qc.stations["USM00072250"].to_dict()["flags"]["temperature"] == {"error": 1}
+    assert qc.summary.pressure_order == 1 and qc.summary.lapse_rate == 1
+
+
+def test_stream():
+    parser = IgraParser(igra_qc_sample.split("\n"))
+    qc = QualityControl()
+    soundings = list(qc.stream(parser.parse(), chunk=2))
+    assert len(soundings) == 3 and soundings[0].levels[0].pressure[0] == 100000
+    assert qc.summary.soundings == 3 and qc.summary.levels == 8
+    flags = qc.summary.to_dict()["flags"]
+    assert flags["elapsed"] == flags["humidity"] == {"missing": 8}
+    assert flags["winddir"] == {"missing": 2} and flags["windspeed"] == {"removed": 1, "missing": 1}
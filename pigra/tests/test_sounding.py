@@ -19,3 +19,72 @@ def test_header():
         location=Location(40.5272, 22.9714)
     )
     assert sounding.header() == "GRM00016622\t2018-01-01T00:00:00+00:00\t  72 levels"
+
+
+def test_select():
+    from pigra.constants import LevelType, QualityFlag
+    sounding = Sounding(
+        station="GRM00016622",
+        obstime=datetime(2018, 1, 1, tzinfo=timezone.utc),
+        reltime=time(23, 33),
+        nlevels=2,
+        datasource_p=P_SRC.ncdc_gts,
+        datasource_np=None,
+        location=Location(40.5272, 22.9714)
+    )
+    missing = (None, QualityFlag.MISSING)
+    surface = Sounding.Level(LevelType.Major.OTHER, LevelType.Minor.SURFACE, missing, (102000, QualityFlag.PASSED),
+                             missing, missing, missing, missing, missing, missing)
+    other = Sounding.Level(LevelType.Major.OTHER, LevelType.Minor.OTHER, missing, (101600, QualityFlag.PASSED),
+                           missing, missing, missing, missing, missing, missing)
+    sounding.add(surface)
+    sounding.add(other)
+    assert sounding.select(minor=LevelType.Minor.SURFACE) == [surface]
+    assert sounding.select(pressure=(100000, 101600)) == [other]
+    assert sounding.select() == [surface, other]
+
+
+def test_level():
+    from datetime import timedelta
+    from pigra.constants import LevelType, QualityFlag
+    level = Sounding.Level(LevelType.Major.STANDARD, LevelType.Minor.OTHER,
+                           (timedelta(minutes=12, seconds=30), QualityFlag.PASSED),
+                           (85000, QualityFlag.PASSED), (1520, QualityFlag.TIERS1),
+                           (-3.2, QualityFlag.PASSED), (None, QualityFlag.REMOVED),
+                           (4.1, QualityFlag.PASSED), (270, QualityFlag.PASSED),
+                           (None, QualityFlag.MISSING))
+    assert not hasattr(level, "__dict__")
+    assert level.elapsed == (timedelta(seconds=750), QualityFlag.PASSED)
+    assert level.pressure[0] == 85000 and isinstance(level.pressure[0], int)
+    assert level.height == (1520, QualityFlag.TIERS1)
+    assert level.temperature[0] == -3.2
+    assert level.humidity == (None, QualityFlag.REMOVED)
+    assert level.winddir == (270, QualityFlag.PASSED)
+    assert level.windspeed == (None, QualityFlag.MISSING)
+    assert level.to_dict()["dewpoint"] == (4.1, QualityFlag.PASSED)
+    assert level == Sounding.Level(**level.to_dict())
+
+
+def test_to_json():
+    import json
+    from datetime import timedelta
+    from pigra.constants import LevelType, QualityFlag
+    sounding = Sounding(
+        station="GRM00016622",
+        obstime=datetime(2018, 1, 1, tzinfo=timezone.utc),
+        reltime=time(23, 33),
+        nlevels=1,
+        datasource_p=P_SRC.ncdc_gts,
+        datasource_np=None,
+        location=Location(40.5272, 22.9714)
+    )
+    missing = (None, QualityFlag.MISSING)
+    sounding.add(Sounding.Level(LevelType.Major.OTHER, LevelType.Minor.SURFACE, (timedelta(seconds=90), QualityFlag.PASSED),
+                                (102000, QualityFlag.PASSED), missing, (-1.5, QualityFlag.TIERS1),
+                                missing, missing, missing, missing))
+    data = sounding.to_dict()
+    assert data["datasource_p"] == "ncdc_gts" and data["datasource_np"] is None
+    assert data["levels"][0]["elapsed"] == ["0:01:30", "passed"]
+    assert data["levels"][0]["temperature"] == [-1.5, "tiers1"]
+    assert json.loads(sounding.to_json()) == data
+    assert "\n" not in sounding.to_json(indent=None)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from pigra.parser import IgraParser
+from pigra.sounding import Location
+from pigra.spatial import SpatialFilter, distance, load_stations
+from pigra.tests.samples import igra_sample
+
+# second sounding a degree further north
+sample = igra_sample[1].replace("2310    3 ncdc-gts           405272", "2310    3 ncdc-gts           415272")
+
+
+def test_contains():
+    greece = SpatialFilter(bbox=(19.3, 34.8, 29.6, 41.7))
+    assert greece.contains(40.5272, 22.9714)
+    assert not greece.contains(48.85, 2.35)
+    pacific = SpatialFilter(bbox=(170, -20, -170, 20))  # across the antimeridian
+    assert pacific.contains(0, 179.5) and pacific.contains(0, -175)
+    assert not pacific.contains(0, 0)
+    near = SpatialFilter(near=(40.5, 23.0, 50))
+    assert near.contains(40.5272, 22.9714)
+    assert not near.contains(41.5272, 22.9714)
+    assert round(distance(0, 0, 0, 1)) == 111
+
+
+def test_parser_near():
+    parser = IgraParser(sample.split("\n"), near=(40.5, 23.0, 50))
+    soundings = [x for x in parser.parse()]
+    assert len(soundings) == 1 and soundings[0].location.lat == 40.5272
+    assert parser.stats == IgraParser.Stats(lines=8, null=1, records=2, processed=1, filtered=1, errors=0, warnings=0)
+    parser = IgraParser.from_buffer(sample.encode(), bbox=(0, 0, 10, 10))
+    assert [x for x in parser.parse()] == []
+    assert parser.stats == IgraParser.Stats(lines=7, null=0, records=2, processed=0, filtered=2, errors=0, warnings=0)
+
+
+def test_prune(tmp_path):
+    stations = tmp_path / "igra2-station-list.txt"
+    stations.write_text("GRM00016622  40.5272   22.9714   4.0    THESSALONIKI                   1955 2021  36000\n"
+                        "FRM00007145  48.7733    2.0100 168.0    TRAPPES                        1941 2021  57000\n")
+    stations = load_stations(str(stations))
+    assert stations["FRM00007145"] == Location(48.7733, 2.01)
+    data = tmp_path / "FRM00007145-data.txt"
+    data.write_text(sample)  # sidecar index takes precedence over the station list
+    from pigra.index import IgraIndex
+    IgraIndex.open(str(data))
+    greece = SpatialFilter(bbox=(19.3, 34.8, 29.6, 41.7))
+    files = ["GRM00016622-data.txt.zip", "FRM00007145-data.txt.zip", "USM00072250-data.txt.zip", str(data)]
+    assert greece.prune(files, stations) == ["GRM00016622-data.txt.zip", "USM00072250-data.txt.zip", str(data)]
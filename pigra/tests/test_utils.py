@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import shutil
+import pytest
+
+from zipfile import ZipFile
+
+from pigra import utils
+from pigra.utils import stream_from, stream_position
+from pigra.tests.samples import igra_sample
+
+
+def test_zip_members(tmp_path):
+    filename = str(tmp_path / "data.zip")
+    first, second = igra_sample[1].split("#GRM00016622 2018 01 02")
+    with ZipFile(filename, "w") as zf:
+        zf.writestr("1.txt", first)
+        zf.writestr("2.txt", "#GRM00016622 2018 01 02" + second)
+    for threaded in (True, False):
+        assert "".join(stream_from(filename, threaded=threaded)) == igra_sample[1]
+    with stream_from(filename, binary=True) as f:
+        f.seek(len(first) + 1)
+        assert f.read(22) == b"GRM00016622 2018 01 02"
+        f.seek(3)
+        assert f.readline() == igra_sample[1].split("\n")[0][3:].encode() + b"\n"
+
+
+def test_gzip(tmp_path, monkeypatch):
+    filename = str(tmp_path / "data.txt.gz")
+    with gzip.open(filename, "wt") as f:
+        f.write(igra_sample[1] * 1000)
+    monkeypatch.setattr(utils, "GZIP_DECODERS", ())
+    stream = stream_from(filename)
+    assert isinstance(stream.buffer.raw, utils.ThreadedReader)
+    assert "".join(stream) == igra_sample[1] * 1000
+    assert 0 < stream_position(stream)
+    stream.close()
+    if shutil.which("gzip") is None:
+        pytest.skip("no external gzip decoder")
+    monkeypatch.setattr(utils, "GZIP_DECODERS", ("gzip",))
+    stream = stream_from(filename)
+    assert isinstance(stream.buffer.raw, utils.ProcessReader)
+    assert "".join(stream) == igra_sample[1] * 1000
+    stream.close()
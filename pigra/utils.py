@@ -1,29 +1,266 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import io
+import os
 import sys
 import gzip
+import mmap
+import queue
+import shutil
+import subprocess
+import threading
 
+from bisect import bisect_right
 from zipfile import ZipFile
 from io import TextIOWrapper
-from typing import Iterable
+from typing import IO, Iterable, List, Optional, cast
 
 
-def stream_from(filename: str) -> Iterable:
+BUFFER_SIZE = 1 << 20  # read size of input layers
+QUEUE_DEPTH = 8  # chunks decompressed ahead by the reader thread
+GZIP_DECODERS = ("pigz", "igzip")  # external gzip decoders, in order of preference
+
+
+class ThreadedReader(io.RawIOBase):
+    """ Reads a binary stream by large chunks on a background thread
+
+    Chunks go through a bounded queue, so decompression (zlib releases the
+    GIL) overlaps with parsing while memory stays bounded.
+    """
+
+    def __init__(self, source, chunk_size=BUFFER_SIZE, depth=QUEUE_DEPTH):
+        super().__init__()
+        self.source = source
+        self.chunk_size = chunk_size
+        self._queue: Optional[queue.Queue] = queue.Queue(depth)  # None at the end of stream
+        self._chunk = memoryview(b"")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        try:
+            while not self._stop.is_set():
+                data = self.source.read(self.chunk_size)
+                self._queue.put(data)
+                if not data:
+                    return
+        except Exception as e:
+            self._queue.put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._chunk:
+            if self._queue is None:
+                return 0
+            data = self._queue.get()
+            if isinstance(data, Exception):
+                raise data
+            if not data:
+                self._queue = None  # end of stream
+                return 0
+            self._chunk = memoryview(data)
+        n = min(len(b), len(self._chunk))
+        b[:n] = self._chunk[:n]
+        self._chunk = self._chunk[n:]
+        return n
+
+    def compressed_position(self) -> Optional[int]:
+        # position of the reader thread, a few chunks ahead of the consumer
+        return stream_position(self.source)
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            while self._queue is not None and self._thread.is_alive():
+                try:  # unblocks the reader thread
+                    self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self._thread.join()
+            self.source.close()
+        super().close()
+
+
+class ProcessReader(io.RawIOBase):
+    """ Reads the standard output of an external decoder (pigz -dc file) """
+
+    def __init__(self, command: List[str], filename: str):
+        super().__init__()
+        self.filename = filename
+        self._file = open(filename, "rb")
+        self._process = subprocess.Popen(command, stdin=self._file, stdout=subprocess.PIPE)
+        self._stdout = cast(io.BufferedReader, self._process.stdout)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b) -> int:
+        n = self._stdout.readinto(b)
+        if not n and self._process.wait() != 0:
+            raise OSError(f"cannot decompress {self.filename} (exit code {self._process.returncode})")
+        return n
+
+    def compressed_position(self) -> Optional[int]:
+        return self._file.tell()
+
+    def close(self):
+        if not self.closed:
+            self._stdout.close()
+            if self._process.poll() is None:
+                self._process.terminate()
+            self._process.wait()
+            self._file.close()
+        super().close()
+
+
+class ZipMembers(io.RawIOBase):
+    """ All members of a zip archive read one after the other, seekable """
+
+    def __init__(self, zf: ZipFile):
+        super().__init__()
+        self.zf = zf
+        self.members = [x for x in zf.infolist() if not x.is_dir()]
+        self._starts = [0]
+        for member in self.members:
+            self._starts.append(self._starts[-1] + member.file_size)
+        self._index = 0
+        self._member: Optional[IO[bytes]] = zf.open(self.members[0]) if self.members else None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b) -> int:
+        while self._member is not None:
+            data = self._member.read(len(b))
+            if data:
+                b[:len(data)] = data
+                return len(data)
+            self._open(self._index + 1)
+        return 0
+
+    def _open(self, index: int):
+        if self._member is not None:
+            self._member.close()
+        self._index = index
+        self._member = self.zf.open(self.members[index]) if index < len(self.members) else None
+
+    def tell(self) -> int:
+        if self._member is None:
+            return self._starts[-1]
+        return self._starts[self._index] + self._member.tell()
+
+    def seek(self, offset: int, whence=io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.tell()
+        elif whence == io.SEEK_END:
+            offset += self._starts[-1]
+        index = bisect_right(self._starts, offset) - 1
+        if index >= len(self.members):
+            self._open(len(self.members))
+        else:
+            if index != self._index or self._member is None:
+                self._open(index)
+            cast(IO[bytes], self._member).seek(offset - self._starts[index])
+        return self.tell()
+
+    def compressed_position(self) -> Optional[int]:
+        if self._member is None:
+            return os.path.getsize(self.zf.filename) if self.zf.filename else None
+        # end of the last read of the member in the archive file
+        return self.zf.fp.tell() if self.zf.fp is not None else None
+
+    def close(self):
+        if not self.closed:
+            if self._member is not None:
+                self._member.close()
+            self.zf.close()
+        super().close()
+
+
+def _text(raw: io.RawIOBase, buffering=BUFFER_SIZE) -> TextIOWrapper:
+    return TextIOWrapper(io.BufferedReader(raw, buffering), encoding="utf-8")
+
+
+def stream_from(filename: str, binary=False, threaded=True, buffering=BUFFER_SIZE) -> Optional[IO]:
+    # binary streams are seekable (sidecar index), text streams used for parsing
+    # are decompressed by an external decoder if any, or on a background thread
+    # buffering : read size of the input layers (and of the reader thread chunks)
     try:
         if filename[-3:] == ".gz":
+            if binary:
+                return cast(IO[bytes], gzip.open(filename, "rb"))
+            decoder = next(filter(None, map(shutil.which, GZIP_DECODERS)), None) if threaded else None
+            if decoder:
+                return _text(ProcessReader([decoder, "-dc"], filename), buffering)
+            if threaded:
+                return _text(ThreadedReader(gzip.open(filename, "rb"), buffering), buffering)
             return gzip.open(filename, "rt", encoding="utf-8")
         elif filename[-4:] == ".zip":
-            zf = ZipFile(filename, 'r')
-            f = zf.namelist()[0]
-            return TextIOWrapper(zf.open(f, 'r'), encoding='utf-8')
+            # every member of the archive, in order
+            members = ZipMembers(ZipFile(filename, 'r'))
+            if binary:
+                return io.BufferedReader(members, buffering)
+            return _text(ThreadedReader(members, buffering) if threaded else members, buffering)
         else:
-            return open(filename, "r", encoding="utf-8")
+            if binary:
+                return open(filename, "rb", buffering=buffering)
+            return open(filename, "r", encoding="utf-8", buffering=buffering)
     except Exception as e:
         print(f"Cannot open file {filename} : {e}", file=sys.stderr)
+        return None
+
+
+def stream_position(stream) -> Optional[int]:
+    # bytes consumed in the underlying file, compressed position for gz/zip
+    try:
+        stream = getattr(stream, "buffer", stream)
+        stream = getattr(stream, "raw", stream)
+        if hasattr(stream, "compressed_position"):
+            return stream.compressed_position()
+        if isinstance(stream, gzip.GzipFile):
+            return cast(IO[bytes], stream.fileobj).tell()
+        return stream.tell()
+    except Exception:
+        return None
+
+
+def mmap_from(filename: str):
+    # read-only memory map of an uncompressed file, pages shared between processes
+    if filename[-3:] == ".gz" or filename[-4:] == ".zip":
+        return None
+    try:
+        with open(filename, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception as e:
+        print(f"Cannot map file {filename} : {e}", file=sys.stderr)
 
 
 def jsonfmt(json_string: str, tabulation=" "*4, indentlvl=0):
     # prepend each line with 4 spaces
     print("\n".join(
         [f"{tabulation*indentlvl}{line}" for line in json_string.split("\n")]))
+
+
+def json_array(items: Iterable[str], out=sys.stdout, tabulation=" "*4):
+    # streams json documents as the indented elements of a json array
+    out.write("[")
+    separator = "\n"
+    for item in items:
+        out.write(separator)
+        out.write(tabulation + item.replace("\n", "\n" + tabulation))
+        separator = ",\n"
+    out.write("\n]\n")
+
+
+def ndjson(items: Iterable[str], out=sys.stdout):
+    # one compact json document per line
+    for item in items:
+        out.write(item)
+        out.write("\n")
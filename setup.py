@@ -28,5 +28,9 @@ setuptools.setup(
     packages=setuptools.find_packages(),
     include_package_data=True,
     install_requires=[],
+    extras_require={
+        "numpy": ["numpy"],
+        "arrow": ["numpy", "pyarrow"]
+    },
     python_requires=">=3.8"
 )